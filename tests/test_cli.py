@@ -0,0 +1,60 @@
+"""tophub 命令行导入开销检查测试 (使用示例 -X importtime 输出)"""
+
+import tophub
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      1500 |       2500 | logging
+import time:       300 |        300 |   logging.handlers
+import time:      9000 |      42000 | requests
+import time:       800 |        800 |     urllib3.util
+import time:      4000 |       4000 | tophub_scraper
+not an importtime line
+import time:   garbage |  garbage   | broken
+"""
+
+
+def test_parse_importtime_reads_cumulative_microseconds():
+    modules = tophub._parse_importtime(SAMPLE)
+    assert modules["requests"] == 42000
+    assert modules["logging.handlers"] == 300
+    assert modules["urllib3.util"] == 800
+    assert "broken" not in modules and "imported package" not in modules
+
+
+def test_allowed_imports_pass():
+    result = tophub._summarize_import_time("scrape", SAMPLE, 0)
+    assert result["ok"] and not result["forbidden"]
+    # 只统计顶层模块
+    assert result["total_ms"] == 48.6
+    assert result["slowest"][0] == ("requests", 42.0)
+
+
+def test_forbidden_import_fails():
+    stderr = SAMPLE + "import time:      7000 |      30000 | bs4\nimport time: 1 | 5 | bs4.element\n"
+    result = tophub._summarize_import_time("scrape", stderr, 0)
+    assert not result["ok"]
+    assert result["forbidden"] == ["bs4"]
+
+    # replay 不应加载 requests (含 urllib3 子模块)
+    result = tophub._summarize_import_time("replay", SAMPLE, 0)
+    assert result["forbidden"] == ["requests", "urllib3"]
+
+
+def test_budget_and_missing_backend():
+    assert not tophub._summarize_import_time("scrape", SAMPLE, 0, budget_ms=10)["ok"]
+
+    stderr = SAMPLE + "ModuleNotFoundError: No module named 'playwright'\n"
+    result = tophub._summarize_import_time("edge", stderr, 1)
+    assert result["ok"] and result["skipped"]
+    assert result["error"] == "ModuleNotFoundError: No module named 'playwright'"
+
+
+def test_strict_treats_skipped_backend_as_failure(monkeypatch, capsys):
+    skipped = {"command": "edge", "ok": True, "skipped": True, "total_ms": 0,
+               "forbidden": [], "slowest": [], "error": "ModuleNotFoundError: playwright"}
+    monkeypatch.setattr(tophub, "check_import_time", lambda command, budget_ms=None: skipped)
+    assert tophub.main(["importtime", "edge"]) == 0
+    assert tophub.main(["importtime", "edge", "--strict"]) == 1
+    assert "[失败] edge" in capsys.readouterr().out
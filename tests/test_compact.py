@@ -0,0 +1,182 @@
+"""tophub_compact 合并、重复执行、删除校验和分层保留测试"""
+
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import tophub_compact
+from tophub_compact import Compactor, iter_archive_items, read_archive
+
+
+NOW = datetime.now()
+
+
+def day_str(days_ago):
+    return (NOW - timedelta(days=days_ago)).strftime("%Y%m%d")
+
+
+def write_snapshot(directory, day, hms, items, fmt="json"):
+    path = os.path.join(directory, f"tophub_{day}_{hms}.{fmt}")
+    if fmt == "json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+    else:
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            f.write("平台,排名,标题,链接,热度,时间戳\n")
+            for item in items:
+                f.write(f"{item['platform']},{item['ranking']},{item['title']},"
+                        f"{item['url']},{item['heat']},{item['timestamp']}\n")
+    # 避开 min_age_seconds 检查
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+    return path
+
+
+def item(platform, ranking, title, heat=None):
+    return {
+        "platform": platform, "ranking": ranking, "title": title,
+        "url": f"https://example.com/{title}", "heat": heat,
+        "timestamp": "2026-10-01T00:00:00"
+    }
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path)
+
+
+def test_compacts_and_dedupes_day(directory):
+    day = day_str(2)
+    write_snapshot(directory, day, "080000", [item("知乎", 1, "a", 100), item("知乎", 2, "b")])
+    write_snapshot(directory, day, "080000", [item("知乎", 1, "a", 100), item("知乎", 2, "b")], "csv")
+    write_snapshot(directory, day, "100000", [item("知乎", 1, "b"), item("知乎", 2, "a", 90)])
+
+    report = Compactor(directory, raw_days=7).run(NOW)
+    assert report.days_compacted == 1
+    assert report.raw_files_removed == 0
+
+    snapshots, entries = read_archive(os.path.join(directory, "tophub_archive", f"tophub_{day}.ndjson.gz"))
+    assert snapshots == [f"{day}_080000", f"{day}_100000"]
+    by_title = {e["title"]: e["seen"] for e in entries}
+    assert by_title["a"] == [[0, 1, 100], [1, 2, 90]]
+    assert by_title["b"] == [[0, 2, None], [1, 1, None]]
+
+
+def test_rerun_is_idempotent_and_merges_late_snapshot(directory):
+    day = day_str(10)
+    write_snapshot(directory, day, "080000", [item("知乎", 1, "a")])
+    compactor = Compactor(directory, raw_days=7)
+    first = compactor.run(NOW)
+    assert first.days_compacted == 1
+    assert first.raw_files_removed == 1
+
+    archive = os.path.join(compactor.archive_dir, f"tophub_{day}.ndjson.gz")
+    mtime = os.path.getmtime(archive)
+    second = compactor.run(NOW)
+    assert second.days_compacted == 0
+    assert os.path.getmtime(archive) == mtime
+
+    # 原始快照已删除后又出现当天的迟到快照，合并进已有归档
+    write_snapshot(directory, day, "120000", [item("知乎", 1, "b"), item("知乎", 2, "a")])
+    third = compactor.run(NOW)
+    assert third.days_compacted == 1
+    assert third.raw_files_removed == 1
+
+    items = list(iter_archive_items(archive))
+    assert sorted((i["title"], i["ranking"], i["timestamp"][11:]) for i in items) == [
+        ("a", 1, "08:00:00"), ("a", 2, "12:00:00"), ("b", 1, "12:00:00")
+    ]
+
+
+def test_keeps_canonical_url(directory):
+    day = day_str(5)
+    resolved = {**item("知乎", 1, "a"), "canonical_url": "https://www.zhihu.com/question/1"}
+    write_snapshot(directory, day, "080000", [resolved, item("知乎", 2, "b")])
+    # CSV 快照没有原文地址，不应覆盖已解析的地址
+    write_snapshot(directory, day, "100000", [item("知乎", 1, "a")], "csv")
+    compactor = Compactor(directory, raw_days=7, compacted_days=6)
+    compactor.run(NOW)
+
+    archive = os.path.join(compactor.archive_dir, f"tophub_{day}.ndjson.gz")
+    _, entries = read_archive(archive)
+    assert {e["title"]: e["canonical_url"] for e in entries} == {
+        "a": "https://www.zhihu.com/question/1", "b": None
+    }
+    assert {i["canonical_url"] for i in iter_archive_items(archive) if i["title"] == "a"} == {
+        "https://www.zhihu.com/question/1"
+    }
+
+    compactor.run(NOW + timedelta(days=2))
+    with gzip.open(os.path.join(compactor.archive_dir, f"tophub_{day}.top.json.gz"), "rt", encoding="utf-8") as f:
+        top = {t["title"]: t["canonical_url"] for t in json.load(f)["items"]}
+    assert top["a"] == "https://www.zhihu.com/question/1"
+
+
+def test_keeps_raw_file_missing_from_readback(directory, monkeypatch):
+    day = day_str(10)
+    kept = write_snapshot(directory, day, "080000", [item("知乎", 1, "a")])
+    removed = write_snapshot(directory, day, "090000", [item("知乎", 1, "b")])
+
+    real_read = tophub_compact.read_archive
+
+    def lossy_read(path):
+        # 模拟归档写入后回读缺少一个快照
+        snapshots, entries = real_read(path)
+        return [ts for ts in snapshots if not ts.endswith("080000")], entries
+
+    monkeypatch.setattr(tophub_compact, "read_archive", lossy_read)
+    report = Compactor(directory, raw_days=7).run(NOW)
+
+    assert os.path.exists(kept)
+    assert not os.path.exists(removed)
+    assert report.raw_files_removed == 1
+
+
+def test_keeps_unreadable_raw_file(directory):
+    day = day_str(10)
+    good = write_snapshot(directory, day, "080000", [item("知乎", 1, "a")])
+    broken = os.path.join(directory, f"tophub_{day}_090000.json")
+    with open(broken, "w", encoding="utf-8") as f:
+        f.write("[{\"platform\": ")
+    old = time.time() - 3600
+    os.utime(broken, (old, old))
+
+    Compactor(directory, raw_days=7).run(NOW)
+    assert not os.path.exists(good)
+    assert os.path.exists(broken)
+
+
+def test_skips_today_and_recent_files(directory):
+    today = write_snapshot(directory, NOW.strftime("%Y%m%d"), "000001", [item("知乎", 1, "a")])
+    recent = write_snapshot(directory, day_str(10), "080000", [item("知乎", 1, "a")])
+    os.utime(recent, None)
+    report = Compactor(directory, raw_days=7, min_age_seconds=300).run(NOW)
+    assert report.days_compacted == 0
+    assert os.path.exists(today) and os.path.exists(recent)
+
+
+def test_demote_to_top_n_and_expire(directory):
+    day = day_str(40)
+    write_snapshot(directory, day, "080000", [item("知乎", i, f"t{i}", 1000 - i) for i in range(1, 6)])
+    write_snapshot(directory, day, "090000", [item("知乎", 1, "t5", 2000)])
+
+    compactor = Compactor(directory, raw_days=7, compacted_days=30, top_n=2, top_days=60)
+    report = compactor.run(NOW)
+    assert report.archives_demoted == 1
+    assert not os.path.exists(os.path.join(compactor.archive_dir, f"tophub_{day}.ndjson.gz"))
+
+    top_path = os.path.join(compactor.archive_dir, f"tophub_{day}.top.json.gz")
+    with gzip.open(top_path, "rt", encoding="utf-8") as f:
+        top = json.load(f)["items"]
+    assert [(t["title"], t["best_ranking"]) for t in top] == [("t5", 1), ("t1", 1)]
+    t5 = next(t for t in top if t["title"] == "t5")
+    assert t5["max_heat"] == 2000 and t5["appearances"] == 2
+
+    # Top-N 超过 top_days 后删除
+    report = compactor.run(NOW + timedelta(days=30))
+    assert report.top_files_removed == 1
+    assert not os.path.exists(top_path)
@@ -0,0 +1,90 @@
+"""tophub_config 加载、校验、相对路径和热加载测试"""
+
+import os
+
+import pytest
+
+from tophub_config import ConfigError, ConfigWatcher, TopHubConfig, load_config
+
+
+def write_config(directory, text):
+    path = directory / "config.py"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_relative_dirs_resolve_against_config_file(tmp_path, monkeypatch):
+    config_dir = tmp_path / "deploy"
+    config_dir.mkdir()
+    path = write_config(config_dir, 'OUTPUT_DIR = "./output"\nLOG_DIR = "logs"\nUSER_DATA_DIR = "edge"\n')
+    monkeypatch.chdir(tmp_path)
+
+    config = load_config(path)
+    assert config.resolve_output_dir() == str(config_dir / "output")
+    assert config.resolve_log_dir() == str(config_dir / "logs")
+    assert config.resolve_user_data_dir() == str(config_dir / "edge")
+
+
+def test_absolute_and_home_dirs_are_kept(tmp_path):
+    path = write_config(tmp_path, f'OUTPUT_DIR = {str(tmp_path / "out")!r}\nLOG_DIR = "~/tophub-logs"\n')
+    config = load_config(path)
+    assert config.resolve_output_dir() == str(tmp_path / "out")
+    assert config.resolve_log_dir() == os.path.join(os.path.expanduser("~"), "tophub-logs")
+
+
+def test_base_dir_is_not_a_config_option(tmp_path):
+    path = write_config(tmp_path, 'BASE_DIR = "/elsewhere"\nMAX_RETRIES = 5\n')
+    config = load_config(path)
+    assert config.base_dir == str(tmp_path)
+    assert config.max_retries == 5
+    assert TopHubConfig(max_retries=5).diff(config) == set()
+
+
+def test_invalid_values_are_reported_together(tmp_path):
+    path = write_config(tmp_path, 'MAX_RETRIES = 0\nDELAY_RANGE = (5, 1)\nCOMPACT_AT = "25:00"\n')
+    with pytest.raises(ConfigError) as exc:
+        load_config(path)
+    assert len(exc.value.errors) == 3
+
+
+def test_watcher_keeps_config_on_error_and_reports_changes(tmp_path):
+    path = write_config(tmp_path, "MAX_RETRIES = 3\n")
+    changes = []
+    watcher = ConfigWatcher(path, load_config(path), lambda old, new, changed: changes.append(changed))
+
+    write_config(tmp_path, "MAX_RETRIES = 0\n")
+    os.utime(path, (1, 1))
+    assert not watcher.check()
+    assert watcher.stats["errors"] == 1 and watcher.config.max_retries == 3
+
+    write_config(tmp_path, "MAX_RETRIES = 4\nLINK_WORKERS = 8\n")
+    os.utime(path, (2, 2))
+    assert watcher.check()
+    assert changes == [{"max_retries", "link_workers"}]
+
+
+def test_overrides_use_config_validators(tmp_path):
+    config = load_config(write_config(tmp_path, 'OUTPUT_DIR = "out"\n'))
+    updated = config.with_overrides({"delay_range": [0.5, 1], "proxy_pool": ["http://p1:8080"]})
+    assert updated.delay_range == (0.5, 1) and updated.proxy_pool == ("http://p1:8080",)
+    assert updated.resolve_output_dir() == str(tmp_path / "out")
+
+    with pytest.raises(ConfigError) as exc:
+        config.with_overrides({"max_retries": 0, "delay_range": [5, 1]}, source="命令行参数")
+    assert len(exc.value.errors) == 2 and "命令行参数" in str(exc.value)
+
+
+def test_cli_rejects_invalid_scrape_overrides(tmp_path, capsys):
+    import tophub
+
+    path = write_config(tmp_path, "MAX_RETRIES = 3\n")
+    assert tophub.main(["--config", path, "scrape", "--retries", "0", "--delay", "5", "1"]) == 2
+    assert "MAX_RETRIES" in capsys.readouterr().err
+
+
+def test_retention_tiers_are_validated(tmp_path):
+    config = load_config(write_config(tmp_path, "RAW_DAYS = 3\nCOMPACTED_DAYS = 30\nTOP_DAYS = None\n"))
+    assert (config.raw_days, config.compacted_days, config.top_n, config.top_days) == (3, 30, 10, None)
+    with pytest.raises(ConfigError) as exc:
+        load_config(write_config(tmp_path, "RAW_DAYS = 10\nCOMPACTED_DAYS = 5\nTOP_N = 0\n"))
+    assert len(exc.value.errors) == 2
@@ -0,0 +1,163 @@
+"""tophub_feed 变更比对、断点续传和 Webhook gap 推送测试"""
+
+import threading
+import time
+
+from tophub_feed import (
+    ChangeFeed,
+    WebhookDispatcher,
+    EVENT_GAP,
+    EVENT_ITEM_ADDED,
+    EVENT_ITEM_HEAT_CHANGED,
+    EVENT_ITEM_RANK_CHANGED,
+    EVENT_ITEM_REMOVED,
+    EVENT_SNAPSHOT,
+)
+from tophub_scraper import HotItem
+
+
+def make_item(platform, ranking, title, heat=None):
+    return HotItem(
+        platform=platform,
+        ranking=ranking,
+        title=title,
+        url=f"https://example.com/{platform}/{title}",
+        heat=heat,
+        timestamp="2026-10-01T00:00:00"
+    )
+
+
+def publish(feed, items):
+    feed.publish(items)
+    return feed.flush()
+
+
+def types(events):
+    return [e.type for e in events]
+
+
+def test_first_publish_adds_all_items():
+    feed = ChangeFeed(coalesce_seconds=0)
+    start = feed.last_event_id
+    feed.publish([make_item("知乎", 1, "a"), make_item("知乎", 2, "b")])
+    replay, _ = feed.subscribe(last_event_id=start)
+    assert types(replay) == [EVENT_ITEM_ADDED, EVENT_ITEM_ADDED, EVENT_SNAPSHOT]
+    assert replay[-1].data["added"] == 2
+
+
+def test_diff_rank_heat_and_removed():
+    feed = ChangeFeed(coalesce_seconds=0)
+    feed.publish([make_item("知乎", 1, "a", 100), make_item("知乎", 2, "b", 50)])
+    start = feed.last_event_id
+    feed.publish([make_item("知乎", 1, "b", 50), make_item("知乎", 2, "c")])
+    replay, _ = feed.subscribe(last_event_id=start)
+
+    by_type = {}
+    for event in replay:
+        by_type.setdefault(event.type, []).append(event)
+    assert by_type[EVENT_ITEM_RANK_CHANGED][0].data["previous_ranking"] == 2
+    assert [e.data["item"]["title"] for e in by_type[EVENT_ITEM_ADDED]] == ["c"]
+    assert [e.data["item"]["title"] for e in by_type[EVENT_ITEM_REMOVED]] == ["a"]
+    assert EVENT_ITEM_HEAT_CHANGED not in by_type
+    assert replay[-1].type == EVENT_SNAPSHOT
+
+
+def test_removal_only_for_platforms_in_batch():
+    feed = ChangeFeed(coalesce_seconds=0)
+    feed.publish([make_item("知乎", 1, "a"), make_item("微博", 1, "x")])
+    start = feed.last_event_id
+    feed.publish([make_item("知乎", 1, "a")])
+    replay, _ = feed.subscribe(last_event_id=start)
+    assert EVENT_ITEM_REMOVED not in types(replay)
+    assert len(feed.snapshot()["items"]) == 2
+
+
+def test_coalesced_publishes_diff_once():
+    feed = ChangeFeed(coalesce_seconds=60)
+    feed.publish([make_item("知乎", 1, "a")])
+    feed.publish([make_item("知乎", 1, "a"), make_item("知乎", 2, "b")])
+    events = feed.flush()
+    assert types(events).count(EVENT_SNAPSHOT) == 1
+    assert types(events).count(EVENT_ITEM_ADDED) == 2
+
+
+def test_replay_filters_platforms():
+    feed = ChangeFeed(coalesce_seconds=0)
+    start = feed.last_event_id
+    feed.publish([make_item("知乎", 1, "a"), make_item("微博", 1, "x")])
+    replay, _ = feed.subscribe(platforms=["微博"], last_event_id=start)
+    assert {e.platform for e in replay} == {"微博", None}
+
+
+def test_replay_after_last_event_id():
+    feed = ChangeFeed(coalesce_seconds=0)
+    feed.publish([make_item("知乎", 1, "a")])
+    last = feed.last_event_id
+    feed.publish([make_item("知乎", 1, "b")])
+    replay, _ = feed.subscribe(last_event_id=last)
+    assert all(e.id > last for e in replay)
+    assert EVENT_GAP not in types(replay)
+
+
+def test_gap_when_buffer_trimmed():
+    feed = ChangeFeed(coalesce_seconds=0, max_events=3)
+    start = feed.last_event_id
+    for i in range(5):
+        feed.publish([make_item("知乎", 1, f"t{i}")])
+    replay, _ = feed.subscribe(last_event_id=start + 1)
+    assert replay[0].type == EVENT_GAP
+    assert replay[0].data["last_event_id"] == start + 1
+    assert replay[0].id == replay[1].id - 1
+
+
+def test_gap_after_restart():
+    before = ChangeFeed(coalesce_seconds=0)
+    for i in range(3):
+        before.publish([make_item("知乎", 1, f"t{i}")])
+    time.sleep(0.05)
+
+    # 重启后 ID 继续递增，旧 ID 早于新缓冲区
+    after = ChangeFeed(coalesce_seconds=0)
+    after.publish([make_item("知乎", 1, "new")])
+    replay, _ = after.subscribe(last_event_id=before.last_event_id)
+    assert replay[0].type == EVENT_GAP
+    assert [e.data["item"]["title"] for e in replay if e.type == EVENT_ITEM_ADDED] == ["new"]
+
+    # 不属于本进程的更大 ID 同样视为中断，补发整个缓冲区
+    replay, _ = after.subscribe(last_event_id=after.last_event_id + 5000)
+    assert replay[0].type == EVENT_GAP
+    assert EVENT_ITEM_ADDED in types(replay)
+
+
+def test_subscriber_overflow_marks_disconnect():
+    feed = ChangeFeed(coalesce_seconds=0, subscriber_queue_size=2)
+    _, subscription = feed.subscribe()
+    feed.publish([make_item("知乎", i, f"t{i}") for i in range(5)])
+    assert subscription.overflowed
+
+
+def test_webhook_delivers_gap_event(caplog):
+    feed = ChangeFeed(coalesce_seconds=0, max_events=3)
+    for i in range(5):
+        feed.publish([make_item("知乎", 1, f"t{i}")])
+
+    dispatcher = WebhookDispatcher(feed, "http://127.0.0.1:9/hook", batch_interval=0.05)
+    dispatcher.last_delivered_id = 1
+    delivered = []
+    done = threading.Event()
+
+    def fake_deliver(session, batch):
+        delivered.append(list(batch))
+        dispatcher.last_delivered_id = batch[-1].id
+        dispatcher._stopping.set()
+        done.set()
+        return True
+
+    dispatcher._deliver = fake_deliver
+    with caplog.at_level("ERROR", logger="tophub_feed"):
+        dispatcher.start()
+        assert done.wait(5)
+        dispatcher.stop()
+
+    assert delivered[0][0].type == EVENT_GAP
+    assert "丢失事件 2-" in caplog.text
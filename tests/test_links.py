@@ -0,0 +1,155 @@
+"""tophub_links 跳转链接解析的代理轮换、限速和 429/5xx 重试测试"""
+
+import pytest
+import requests
+
+import tophub_links
+from tophub_config import TopHubConfig
+from tophub_links import HostThrottle, LinkResolver
+
+REDIRECT = "https://tophub.today/l/abc"
+TARGET = "https://news.example.com/article/1"
+
+
+def moved(location=TARGET):
+    return FakeResponse(302, REDIRECT, {"Location": location})
+
+
+class FakeResponse:
+    def __init__(self, status_code, url, headers=None, body=b""):
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers or {}
+        self.encoding = "utf-8"
+        self.body = body
+
+    def iter_content(self, size, decode_unicode=False):
+        yield self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(tophub_links.time, "sleep", slept.append)
+    return slept
+
+
+@pytest.fixture
+def resolver(tmp_path, sleeps):
+    r = LinkResolver(str(tmp_path / "links.db"), max_workers=2, host_interval=0)
+    yield r
+    r.close()
+
+
+def script(resolver, responses):
+    """按顺序返回预设响应，记录每次请求的参数"""
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append((method, url, kwargs))
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    resolver.session.request = request
+    return calls
+
+
+def test_429_honors_retry_after_and_caches_result(resolver, sleeps):
+    script(resolver, [
+        FakeResponse(429, REDIRECT, {"Retry-After": "7"}),
+        moved(),
+    ])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: TARGET}
+    assert sleeps and 6 < sleeps[0] <= 7
+    assert resolver.cache.get_many([REDIRECT]) == {REDIRECT: TARGET}
+
+
+def test_exhausted_5xx_is_not_negative_cached(resolver):
+    script(resolver, [FakeResponse(503, REDIRECT, {"Retry-After": "0"}) for _ in range(3)])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: None}
+    assert resolver.stats["deferred"] == 1
+    assert resolver.cache.get_many([REDIRECT]) == {}
+
+
+def test_retry_after_beyond_limit_defers_to_next_run(resolver, sleeps):
+    calls = script(resolver, [FakeResponse(429, REDIRECT, {"Retry-After": "3600"})])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: None}
+    assert len(calls) == 1 and not sleeps
+    assert resolver.cache.get_many([REDIRECT]) == {}
+
+
+def test_404_is_negative_cached(resolver):
+    script(resolver, [FakeResponse(404, REDIRECT), FakeResponse(404, REDIRECT)])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: None}
+    assert resolver.stats["failed"] == 1
+    assert resolver.cache.get_many([REDIRECT]) == {REDIRECT: None}
+
+
+def test_rotates_proxies_and_user_agents_from_config(resolver):
+    resolver.apply_config(TopHubConfig(
+        proxy_pool=("http://p1:8080", "http://p2:8080"), user_agents=("UA-1", "UA-2")
+    ))
+    calls = script(resolver, [
+        requests.exceptions.ProxyError("代理不可用"),
+        moved(),
+    ])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: TARGET}
+    assert [kw["proxies"]["https"] for _, _, kw in calls] == ["http://p1:8080", "http://p2:8080"]
+    assert [kw["headers"]["User-Agent"] for _, _, kw in calls] == ["UA-1", "UA-2"]
+
+    resolver.apply_config(TopHubConfig())
+    calls = script(resolver, [moved()])
+    resolver.resolve(["https://tophub.today/l/other"])
+    assert calls[0][2]["proxies"] is None and calls[0][2]["headers"] is None
+
+
+def test_takes_target_from_location_without_visiting_it(resolver):
+    calls = script(resolver, [moved()])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: TARGET}
+    assert [(method, url) for method, url, _ in calls] == [("HEAD", REDIRECT)]
+    assert calls[0][2]["allow_redirects"] is False
+
+
+def test_follows_same_host_redirects_only(resolver):
+    calls = script(resolver, [
+        moved("/l/abc?ref=1"),
+        moved(),
+    ])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: TARGET}
+    assert [url for _, url, _ in calls] == [REDIRECT, "https://tophub.today/l/abc?ref=1"]
+
+
+def test_falls_back_to_get_for_refresh_page(resolver):
+    page = f'<meta http-equiv="refresh" content="0;url={TARGET}">'.encode()
+    calls = script(resolver, [
+        FakeResponse(405, REDIRECT),
+        FakeResponse(200, REDIRECT, body=page),
+    ])
+    assert resolver.resolve([REDIRECT]) == {REDIRECT: TARGET}
+    assert [method for method, _, _ in calls] == ["HEAD", "GET"]
+
+
+def test_host_throttle_spaces_requests_and_defers(monkeypatch):
+    clock = [100.0]
+    slept = []
+    monkeypatch.setattr(tophub_links.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(tophub_links.time, "sleep", slept.append)
+
+    throttle = HostThrottle(0.5)
+    assert throttle.acquire("tophub.today")
+    assert throttle.acquire("tophub.today")
+    assert throttle.acquire("other.example.com")
+    assert slept == [0.5]
+
+    throttle.defer("tophub.today", 30)
+    assert not throttle.acquire("tophub.today", max_wait=10)
+    assert throttle.acquire("tophub.today", max_wait=60)
+    assert slept[-1] == 30
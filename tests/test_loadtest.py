@@ -0,0 +1,54 @@
+"""tophub_loadtest 报告统计与饱和判定测试"""
+
+import pytest
+
+from tophub_loadtest import LoadTestReport, MockTopHubServer
+
+
+def cycle(duration, lag=0.1, drift=0.0):
+    return {"started": 0.0, "lag": lag, "drift": drift, "duration": duration, "items": 10}
+
+
+def test_drift_alone_is_not_saturation():
+    # 每轮 20 秒、间隔 60 秒，300 秒内只能跑 4 轮 (0, 80, 160, 240)，不算错过
+    report = LoadTestReport(5, 0, interval=60, duration=300,
+                            cycles=[cycle(20, drift=20 * n) for n in range(4)])
+    summary = report.summary()
+    assert summary["cycles_expected"] == summary["cycles_completed"] == 4
+    assert summary["cycles_missed"] == 0
+    assert summary["schedule_lag_max_s"] == 0.1
+    assert summary["schedule_drift_s"] == 60
+    assert not summary["saturated"]
+
+
+def test_overrun_or_missed_cycle_is_saturation():
+    overrun = LoadTestReport(50, 0, interval=60, duration=300,
+                             cycles=[cycle(30), cycle(75), cycle(30)]).summary()
+    assert overrun["cycles_overrun"] == 1 and overrun["utilization"] < 1
+    assert overrun["saturated"]
+
+    stalled = LoadTestReport(5, 0, interval=60, duration=300, cycles=[cycle(5)], missed=1).summary()
+    assert stalled["cycles_expected"] == 2 and stalled["saturated"]
+
+
+def test_mock_serves_redirects_resolved_by_link_resolver(tmp_path):
+    pytest.importorskip("requests")
+    from tophub_links import LinkResolver
+    from tophub_scraper import TopHubScraper
+
+    server = MockTopHubServer(platforms_per_page=1, items_per_platform=3, latency=(0, 0), churn=0)
+    server.start()
+    resolver = LinkResolver(str(tmp_path / "links.db"), host_interval=0,
+                            redirect_prefix=server.redirect_prefix)
+    try:
+        items = TopHubScraper(delay_range=(0, 0)).scrape(server.category_urls(1))
+        assert items and all(resolver.is_redirect_link(item.url) for item in items)
+        resolver.resolve_items(items)
+        assert {item.url: item.canonical_url for item in items} == {
+            f"{server.redirect_prefix}c0-0-{i}": f"https://example.com/article/c0-0-{i}"
+            for i in range(1, 4)
+        }
+        assert server.stats["redirects"] == 3
+    finally:
+        resolver.close()
+        server.stop()
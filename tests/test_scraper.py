@@ -0,0 +1,163 @@
+"""tophub_scraper 配置应用、User-Agent/代理轮换、流式解析和保存测试"""
+
+import json
+
+import pytest
+
+from tophub_config import TopHubConfig
+from tophub_scraper import HotItem, TopHubScraper
+
+
+def test_user_agents_rotate_in_order_without_random_ua():
+    scraper = TopHubScraper.from_config(TopHubConfig(user_agents=("UA-1", "UA-2", "UA-3")))
+    assert [scraper._get_user_agent() for _ in range(4)] == ["UA-1", "UA-2", "UA-3", "UA-1"]
+
+
+def test_random_ua_picks_from_list():
+    scraper = TopHubScraper.from_config(TopHubConfig(user_agents=("UA-1", "UA-2"), random_ua=True))
+    assert {scraper._get_user_agent() for _ in range(20)} <= {"UA-1", "UA-2"}
+
+
+def test_no_user_agents_keeps_default_headers():
+    assert TopHubScraper()._get_user_agent() is None
+
+
+def test_apply_config_restarts_rotation_only_when_lists_change():
+    config = TopHubConfig(user_agents=("UA-1", "UA-2"), proxy_pool=("http://p1:1", "http://p2:2"))
+    scraper = TopHubScraper.from_config(config)
+    scraper._get_user_agent()
+    scraper._get_proxy()
+
+    scraper.apply_config(config)
+    assert scraper._get_user_agent() == "UA-2"
+    assert scraper._get_proxy()["http"] == "http://p2:2"
+
+    scraper.apply_config(TopHubConfig(user_agents=("UA-9", "UA-1"), proxy_pool=("http://p3:3",)))
+    assert scraper._get_user_agent() == "UA-9"
+    assert scraper._get_proxy()["http"] == "http://p3:3"
+
+
+# ---------- 流式解析 ----------
+
+def platform_block(name, titles, hot=True):
+    # 与 tophub.today 一致: 榜单容器内嵌套多个 class 以 cc-cd 开头的 div
+    links = "".join(
+        f'<a href="/l/{name}-{i}"><div class="cc-cd-cb-ll"><span class="s">{i}</span>'
+        f'<span class="t">{title}</span>'
+        + (f'<span class="hot">{i * 10}万</span>' if hot else "")
+        + '</div></a>'
+        for i, title in enumerate(titles, 1)
+    )
+    return (
+        f'<div class="cc-cd"><div class="cc-cd-ih"><div class="cc-cd-is">'
+        f'<a href="/n/{name}"><div class="cc-cd-lb"><span>{name}</span></div></a></div></div>'
+        f'<div class="cc-cd-cb nano"><div class="cc-cd-cb-l nano-content">{links}</div></div></div>'
+    )
+
+
+PAGE = (
+    '<html><body><div class="bc">'
+    + platform_block("知乎", ["台风登陆", "股市收涨", "新品发布"])
+    + platform_block("微博", ["热搜一", "热搜二"], hot=False)
+    + platform_block("百度", ["百度一"])
+    + '</div></body></html>'
+)
+
+
+def reference_parse(scraper, html):
+    """流式解析之前的 parse_page 实现: 一次性选出全部容器，不释放解析树"""
+    from bs4 import BeautifulSoup
+
+    items = []
+    for container in BeautifulSoup(html, "lxml").select('div[class^="cc-cd"]'):
+        platform = scraper._extract_platform_name(container)
+        for idx, elem in enumerate(container.select('div[class^="cc-cd-cb"] a, div.cc-cd-cb a'), 1):
+            title = elem.get_text(strip=True)
+            if not title:
+                continue
+            heat_elem = elem.select_one('.heat, [class*="heat"], .hot, [class*="hot"]')
+            url = elem.get("href", "")
+            items.append((
+                platform, idx, title, "https://tophub.today" + url,
+                scraper._parse_heat_value(heat_elem.get_text()) if heat_elem else None
+            ))
+    return items
+
+
+def fields(items):
+    return [(i.platform, i.ranking, i.title, i.url, i.heat) for i in items]
+
+
+def test_iter_parse_matches_reference_parser_with_nested_containers():
+    scraper = TopHubScraper()
+    items = list(scraper.iter_parse(PAGE))
+    assert fields(items) == reference_parse(scraper, PAGE)
+    assert fields(scraper.parse_page(PAGE)) == fields(items)
+    assert [i.heat for i in items if i.platform == "知乎"] == [100000, 200000, 300000]
+    assert [i.title for i in items if i.platform == "微博"] == ["1热搜一", "2热搜二"]
+
+
+def test_abandoned_iter_parse_releases_tree(monkeypatch):
+    from bs4 import BeautifulSoup
+
+    released = []
+    original = BeautifulSoup.decompose
+    monkeypatch.setattr(BeautifulSoup, "decompose",
+                        lambda self: (released.append(self), original(self))[1])
+
+    gen = TopHubScraper().iter_parse(PAGE)
+    next(gen)
+    assert released == []
+    gen.close()
+    assert len(released) == 1
+
+
+def test_iter_parse_releases_finished_platforms(monkeypatch):
+    from bs4.element import Tag
+
+    released = []
+    original = Tag.decompose
+    monkeypatch.setattr(Tag, "decompose", lambda self: (released.append(
+        self.get("class") if self.name == "div" else None), original(self))[1])
+
+    gen = TopHubScraper().iter_parse(PAGE)
+    first = next(gen)
+    assert first.platform == "知乎" and released == []
+    # 进入第二个平台时第一个平台的顶层容器(连同其中嵌套的容器)已释放
+    while next(gen).platform != "微博":
+        pass
+    assert released == [["cc-cd"]]
+    gen.close()
+
+
+def test_iter_scrape_is_lazy_and_skips_failed_pages():
+    scraper = TopHubScraper()
+    requested = []
+
+    def make_request(url):
+        requested.append(url)
+        return None if url.endswith("bad") else PAGE
+
+    scraper._make_request = make_request
+    gen = scraper.iter_scrape(["https://tophub.today/c/news", "https://tophub.today/c/bad",
+                               "https://tophub.today/c/tech"])
+    next(gen)
+    assert requested == ["https://tophub.today/c/news"]
+    rest = list(gen)
+    assert len(rest) + 1 == 2 * len(scraper.parse_page(PAGE))
+    assert requested[-1] == "https://tophub.today/c/tech"
+
+
+@pytest.mark.parametrize("count", [0, 1, 3])
+def test_save_to_json_matches_json_dump(tmp_path, count):
+    items = [
+        HotItem(platform="知乎", ranking=i, title=f'标题 "{i}"\n换行', url=f"https://example.com/{i}",
+                heat=i * 100 or None, timestamp="2026-10-01T08:00:00",
+                canonical_url="https://www.zhihu.com/q/1" if i % 2 else None)
+        for i in range(count)
+    ]
+    streamed, expected = tmp_path / "streamed.json", tmp_path / "expected.json"
+    TopHubScraper().save_to_json(iter(items), str(streamed))
+    with open(expected, "w", encoding="utf-8") as f:
+        json.dump([i.to_dict() for i in items], f, ensure_ascii=False, indent=2)
+    assert streamed.read_bytes() == expected.read_bytes()
@@ -0,0 +1,173 @@
+"""tophub_scraper_edge 浏览器启动参数与多标签页并行爬取测试 (不启动浏览器)"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+
+import tophub_scraper_edge
+from tophub_scraper_edge import TopHubEdgeScraper
+
+
+class FakeContext:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def add_init_script(self, script):
+        pass
+
+    async def close(self):
+        self.calls.append(("context.close",))
+
+
+class FakeBrowser:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def new_context(self, **kwargs):
+        self.calls.append(("new_context", kwargs))
+        return FakeContext(self.calls)
+
+    async def close(self):
+        self.calls.append(("browser.close",))
+
+
+class FakeChromium:
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def launch(self, **kwargs):
+        self.calls.append(("launch", kwargs))
+        return FakeBrowser(self.calls)
+
+    async def launch_persistent_context(self, user_data_dir, **kwargs):
+        self.calls.append(("launch_persistent_context", user_data_dir, kwargs))
+        return FakeContext(self.calls)
+
+
+class FakePlaywright:
+    def __init__(self, calls):
+        self.chromium = FakeChromium(calls)
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(tophub_scraper_edge, "async_playwright", lambda: FakePlaywright(calls))
+    return calls
+
+
+def run(scraper):
+    async def enter_and_exit():
+        async with scraper:
+            pass
+    asyncio.run(enter_and_exit())
+
+
+def test_user_data_dir_uses_persistent_context(calls, tmp_path):
+    run(TopHubEdgeScraper(user_data_dir=str(tmp_path), user_agent="UA-1"))
+    name, user_data_dir, kwargs = calls[0]
+    assert name == "launch_persistent_context" and user_data_dir == str(tmp_path)
+    assert kwargs["user_agent"] == "UA-1" and "headless" in kwargs
+    assert calls[-1] == ("context.close",)
+    assert not any(c[0] == "launch" for c in calls)
+
+
+def test_without_user_data_dir_launches_browser(calls):
+    run(TopHubEdgeScraper())
+    assert [c[0] for c in calls] == ["launch", "new_context", "browser.close"]
+    assert "user_data_dir" not in calls[0][1]
+
+
+# ---------- scrape_many ----------
+
+def edge_item(url, title):
+    return tophub_scraper_edge.HotItem(
+        platform="知乎", ranking=1, title=title, url=url, heat=None,
+        timestamp="2026-10-01T00:00:00", category=tophub_scraper_edge.category_from_url(url)
+    )
+
+
+def stub_pages(scraper, behaviors):
+    """按 URL 指定标签页行为: (延迟秒数, 结果或异常)"""
+    active = {"now": 0, "max": 0}
+
+    async def scrape_url(url):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        try:
+            delay, outcome = behaviors[url]
+            await asyncio.sleep(delay)
+            if isinstance(outcome, BaseException):
+                raise outcome
+            return [edge_item(url, title) for title in outcome]
+        finally:
+            active["now"] -= 1
+
+    scraper._scrape_url = scrape_url
+    return active
+
+
+def test_scrape_many_merges_in_url_order_and_limits_tabs():
+    scraper = TopHubEdgeScraper(max_tabs=2)
+    urls = [f"https://tophub.today/c/{name}" for name in ("news", "tech", "ent")]
+    active = stub_pages(scraper, {
+        urls[0]: (0.03, ["n1", "n2"]), urls[1]: (0.0, ["t1"]), urls[2]: (0.01, ["e1"]),
+    })
+    items = asyncio.run(scraper.scrape_many(urls + [urls[0]]))
+    assert [(i.category, i.title) for i in items] == [
+        ("news", "n1"), ("news", "n2"), ("tech", "t1"), ("ent", "e1")
+    ]
+    assert active["max"] == 2
+
+
+def test_scrape_many_isolates_timeouts_and_failures():
+    scraper = TopHubEdgeScraper(max_tabs=4, tab_timeout=0.05)
+    urls = [f"https://tophub.today/c/{name}" for name in ("slow", "error", "cancelled", "ok")]
+    stub_pages(scraper, {
+        urls[0]: (1.0, ["never"]),
+        urls[1]: (0.0, RuntimeError("页面结构变化")),
+        urls[2]: (0.0, asyncio.CancelledError()),
+        urls[3]: (0.0, ["fine"]),
+    })
+    items = asyncio.run(scraper.scrape_many(urls))
+    assert [(i.category, i.title) for i in items] == [("ok", "fine")]
+
+
+class FakePage:
+    async def goto(self, url, **kwargs):
+        pass
+
+    async def wait_for_selector(self, selector, **kwargs):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakePageContext:
+    async def new_page(self):
+        return FakePage()
+
+
+def test_scrape_url_tags_items_with_category(monkeypatch):
+    scraper = TopHubEdgeScraper()
+    scraper.context = FakePageContext()
+
+    async def no_scroll(page):
+        pass
+
+    async def extract(page, category=None):
+        return [tophub_scraper_edge.HotItem("知乎", 1, "a", "u", None, "t", category=category)]
+
+    monkeypatch.setattr(scraper, "_scroll_to_load", no_scroll)
+    monkeypatch.setattr(scraper, "_extract_data", extract)
+    items = asyncio.run(scraper.scrape_many(["https://tophub.today/c/tech", "https://tophub.today/n/KqndgxeLl9"]))
+    assert [i.category for i in items] == ["tech", "KqndgxeLl9"]
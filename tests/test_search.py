@@ -0,0 +1,117 @@
+"""tophub_search 分词、查询表达式和检索测试"""
+
+import json
+
+import pytest
+
+from tophub_scraper import parse_heat_value
+from tophub_search import SearchIndex, _match_expression, tokenize
+
+
+def item(platform, ranking, title, heat=None, url=None):
+    return {
+        "platform": platform, "ranking": ranking, "title": title,
+        "url": url or f"https://example.com/{platform}/{title}", "heat": heat,
+        "timestamp": "2026-10-01T08:00:00"
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = SearchIndex(str(tmp_path / "search.db"))
+    yield idx
+    idx.close()
+
+
+def test_tokenize_cjk_bigrams_and_words():
+    assert tokenize("台风登陆") == [["台风", "风登", "登陆"]]
+    assert tokenize("iPhone 17 发布") == [["iphone"], ["17"], ["发布"]]
+    assert tokenize("台") == [["台"]]
+    assert tokenize("") == []
+
+
+def test_match_expression():
+    assert _match_expression("台风登陆") == 'bigrams : "台风 风登 登陆"'
+    assert _match_expression("台") == 'unigrams : "台"'
+    assert _match_expression("台风 GPT") == 'bigrams : "台风" AND bigrams : "gpt"'
+    assert _match_expression("!!") is None
+
+
+def test_parse_heat_value():
+    assert parse_heat_value("644万热度") == 6440000
+    assert parse_heat_value("1.2亿") == 120000000
+    assert parse_heat_value(" 3521 ") == 3521
+    assert parse_heat_value(42) == 42
+    assert parse_heat_value(None) is None
+    assert parse_heat_value("热") is None
+
+
+def test_phrase_search_requires_adjacent_characters(index):
+    index.add_items([
+        item("微博", 1, "台风登陆浙江沿海"),
+        item("知乎", 2, "登陆台风季的准备"),
+    ], "20261001_080000")
+    assert [r.title for r in index.search("台风登陆")] == ["台风登陆浙江沿海"]
+    assert len(index.search("台风")) == 2
+
+
+def test_single_character_and_english_queries(index):
+    index.add_items([
+        item("微博", 1, "猫咪走红"),
+        item("IT之家", 3, "OpenAI 发布新模型"),
+    ], "20261001_080000")
+    assert [r.title for r in index.search("猫")] == ["猫咪走红"]
+    assert [r.title for r in index.search("openai")] == ["OpenAI 发布新模型"]
+
+
+def test_aggregates_hits_and_sorts(index):
+    index.add_items([item("微博", 3, "台风A", "10万"), item("微博", 1, "台风B", 500)], "20261001_080000")
+    index.add_items([item("微博", 1, "台风A", "80万")], "20261001_100000")
+
+    results = {r.title: r for r in index.search("台风")}
+    assert results["台风A"].appearances == 2
+    assert results["台风A"].best_ranking == 1
+    assert results["台风A"].max_heat == 800000
+    assert [r.title for r in index.search("台风", sort="heat")] == ["台风A", "台风B"]
+    assert [r.title for r in index.search("台风", sort="recent")][0] == "台风A"
+
+
+def test_filters_platform_and_time_range(index):
+    index.add_items([item("微博", 1, "台风来了")], "20261001_080000")
+    index.add_items([item("知乎", 1, "台风过境")], "20261003_080000")
+
+    assert [r.title for r in index.search("台风", platforms=["知乎"])] == ["台风过境"]
+    assert [r.title for r in index.search("台风", since="2026-10-02")] == ["台风过境"]
+    assert [r.title for r in index.search("台风", until="2026-10-02")] == ["台风来了"]
+    assert index.platform_counts("台风") == {"微博": 1, "知乎": 1}
+
+
+def test_reindex_same_snapshot_does_not_duplicate(index):
+    items = [item("微博", 1, "台风来了")]
+    index.add_items(items, "20261001_080000")
+    index.add_items(items, "20261001_080000")
+    assert index.search("台风")[0].appearances == 1
+
+
+def test_index_directory_skips_imported_files(index, tmp_path):
+    path = tmp_path / "tophub_20261001_080000.json"
+    path.write_text(json.dumps([item("微博", 1, "台风来了")], ensure_ascii=False), encoding="utf-8")
+    assert index.index_directory(str(tmp_path)) == 1
+    assert index.index_directory(str(tmp_path)) == 0
+
+
+def test_rejects_unparseable_time_range(index):
+    index.add_items([item("微博", 1, "台风来了")], "20261001_080000")
+    with pytest.raises(ValueError):
+        index.search("台风", since="2026/10/01")
+    with pytest.raises(ValueError):
+        index.platform_counts("台风", until="昨天")
+    # 空字符串等同于不限制
+    assert len(index.search("台风", since="", until=None)) == 1
+
+
+def test_rejects_empty_query_and_bad_sort(index):
+    with pytest.raises(ValueError):
+        index.search("!!")
+    with pytest.raises(ValueError):
+        index.search("台风", sort="random")
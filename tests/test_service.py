@@ -0,0 +1,97 @@
+"""tophub_service 配置热加载测试 (不发出网络请求)"""
+
+import os
+import threading
+
+import pytest
+
+from tophub_scraper import HotItem
+from tophub_service import TopHubService
+
+
+def write_config(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "config.py"
+    write_config(path, 'LOG_DIR = "logs"\nURLS = ["https://tophub.today/c/tech"]\n', 1)
+    return path
+
+
+def make_service(tmp_path, config_path, **kwargs):
+    service = TopHubService(output_dir=str(tmp_path / "out"), config_path=str(config_path), **kwargs)
+    service.config_watcher.stop()
+    return service
+
+
+def reload(service, config_path, text, mtime):
+    write_config(config_path, 'LOG_DIR = "logs"\n' + text, mtime)
+    assert service.config_watcher.check()
+    service.apply_pending_config()
+
+
+def test_reload_applies_file_values(tmp_path, config_path):
+    service = make_service(tmp_path, config_path)
+    try:
+        reload(service, config_path, 'URLS = ["https://tophub.today/c/news"]\nLINK_WORKERS = 4\n', 2)
+        assert service.urls == ["https://tophub.today/c/news"]
+        assert service.link_resolver.max_workers == 4
+    finally:
+        service.stop(timeout=5)
+
+
+def test_explicit_arguments_survive_reload(tmp_path, config_path):
+    service = make_service(tmp_path, config_path, urls=["https://tophub.today/c/ent"])
+    # 只执行调度器的启动步骤，不爬取
+    service.crawl_job = lambda: setattr(service, "running", False)
+    try:
+        service.run_scheduler(interval_hours=0.5)
+        reload(service, config_path,
+               'URLS = ["https://tophub.today/c/news"]\nSCHEDULE_INTERVAL = 3\nLINK_WORKERS = 4\n', 2)
+        assert service.urls == ["https://tophub.today/c/ent"]
+        assert service.interval_hours == 0.5
+        assert service.link_resolver.max_workers == 4
+    finally:
+        service.stop(timeout=5)
+
+
+def test_retention_tiers_from_config_and_reload(tmp_path, config_path):
+    write_config(config_path, 'LOG_DIR = "logs"\nRAW_DAYS = 3\nCOMPACTED_DAYS = 30\nTOP_N = 5\n', 1)
+    service = make_service(tmp_path, config_path)
+    try:
+        compactor = service.compactor
+        assert (compactor.raw_days, compactor.compacted_days, compactor.top_n, compactor.top_days) == (3, 30, 5, None)
+        reload(service, config_path, 'RAW_DAYS = 3\nCOMPACTED_DAYS = 90\nTOP_N = 5\nTOP_DAYS = 365\n', 2)
+        assert (compactor.compacted_days, compactor.top_days) == (90, 365)
+    finally:
+        service.stop(timeout=5)
+
+
+def test_links_resolve_off_the_scheduler_thread(tmp_path, config_path):
+    service = make_service(tmp_path, config_path)
+    release = threading.Event()
+    submitted = []
+    items = [HotItem("知乎", 1, "标题", "https://tophub.today/l/abc", 100, "2026-01-01 00:00:00")]
+    service.scraper.scrape = lambda urls: list(items)
+
+    def resolve_items(batch):
+        release.wait(5)
+        for item in batch:
+            item.canonical_url = "https://example.com/a"
+        return batch
+
+    service.link_resolver.resolve_items = resolve_items
+    service.pipeline.submit = lambda batch, timestamp: submitted.append(batch)
+    try:
+        assert service.crawl_job() == items
+        # 调度线程不等待解析，解析完成后才提交
+        assert not submitted and not service.wait_for_links(0)
+        release.set()
+        assert service.wait_for_links(5)
+        assert submitted[0][0].canonical_url == "https://example.com/a"
+    finally:
+        release.set()
+        service.stop(timeout=5)
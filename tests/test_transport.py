@@ -0,0 +1,119 @@
+"""tophub_transport 压缩统计、Accept-Encoding 协商和异常映射测试 (本地 http.server)"""
+
+import gzip
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import tophub_transport
+from tophub_transport import (
+    TransportError,
+    TransportProxyError,
+    TransportTimeout,
+    create_transport,
+)
+
+BODY = ("<html>" + "今日热榜 台风 股市 新品发布 " * 500 + "</html>").encode("utf-8")
+GZIPPED = gzip.compress(BODY)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    seen_headers = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        Handler.seen_headers.append(dict(self.headers))
+        if self.path == "/slow":
+            time.sleep(1)
+        gzip_ok = "gzip" in self.headers.get("Accept-Encoding", "")
+        body = GZIPPED if gzip_ok else BODY
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if gzip_ok:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_CONNECT(self):
+        # 模拟拒绝隧道的代理
+        self.send_response(403)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+TRANSPORTS = ["requests", pytest.param("httpx", marks=pytest.mark.skipif(
+    not tophub_transport._has_module("httpx"), reason="未安装 httpx"))]
+
+
+@pytest.fixture(params=TRANSPORTS)
+def transport(request):
+    transport = create_transport(request.param, headers={"User-Agent": "test"})
+    yield transport
+    transport.close()
+
+
+def test_gzip_byte_accounting(server, transport):
+    response = transport.get(f"{server}/c/news", timeout=5)
+    assert response.status_code == 200
+    assert response.text == BODY.decode("utf-8")
+    assert response.content_encoding == "gzip"
+    assert response.wire_bytes == len(GZIPPED)
+    assert response.body_bytes == len(BODY)
+    assert transport.stats["wire_bytes"] >= len(GZIPPED) and transport.stats["requests"] >= 1
+
+
+def test_accept_encoding_matches_decoders(server, transport):
+    transport.get(f"{server}/c/news", timeout=5)
+    sent = [e.strip() for e in Handler.seen_headers[-1]["Accept-Encoding"].split(",")]
+    assert sent == transport.supported_encodings()
+    assert {"gzip", "deflate"} <= set(sent)
+
+
+@pytest.mark.skipif(not tophub_transport._has_module("httpx"), reason="未安装 httpx")
+def test_httpx_encodings_follow_installed_decoders(monkeypatch):
+    installed = {"zstandard"}
+    monkeypatch.setattr(tophub_transport, "_has_module", lambda name: name in installed)
+    transport = create_transport("httpx")
+    assert transport.supported_encodings() == ["gzip", "deflate", "zstd"]
+    installed.add("brotlicffi")
+    assert transport.supported_encodings() == ["gzip", "deflate", "br", "zstd"]
+    transport.close()
+
+
+def test_timeout_maps_to_transport_timeout(server, transport):
+    with pytest.raises(TransportTimeout):
+        transport.get(f"{server}/slow", timeout=0.2)
+
+
+def test_connection_error_maps_to_transport_error(transport):
+    with pytest.raises(TransportError) as exc:
+        transport.get(f"http://127.0.0.1:{closed_port()}/", timeout=2)
+    assert not isinstance(exc.value, (TransportTimeout, TransportProxyError))
+
+
+def test_rejected_proxy_maps_to_transport_proxy_error(server, transport):
+    with pytest.raises(TransportProxyError):
+        transport.get("https://tophub.invalid/", proxies={"http": server, "https": server}, timeout=5)
@@ -0,0 +1,158 @@
+"""tophub_writer 输出管道重试、死信和 NDJSON 追加幂等测试"""
+
+import errno
+import json
+import threading
+import time
+
+import pytest
+
+import tophub_writer
+from tophub_scraper import HotItem
+from tophub_writer import FsyncBatch, NdjsonSink, OutputPipeline, Sink, Snapshot
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(tophub_writer.time, "sleep", lambda seconds: None)
+
+
+def make_items(n, prefix="t"):
+    return [
+        HotItem(platform="知乎", ranking=i, title=f"{prefix}{i}", url=f"https://example.com/{i}",
+                heat=i * 10, timestamp="2026-10-01T00:00:00")
+        for i in range(1, n + 1)
+    ]
+
+
+class FlakySink(Sink):
+    name = "flaky"
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.written = []
+
+    def write(self, snapshot, batch):
+        if self.failures > 0:
+            self.failures -= 1
+            raise OSError("写入失败")
+        self.written.append(snapshot.timestamp)
+
+
+def test_retry_then_success():
+    sink = FlakySink(failures=2)
+    pipeline = OutputPipeline([sink], max_retries=3, fsync=False)
+    pipeline.submit(make_items(3), "20261001_000000")
+    pipeline.close()
+    assert sink.written == ["20261001_000000"]
+    assert pipeline.stats["written"] == 1
+    assert pipeline.stats["failed"] == 0
+
+
+def test_dead_letter_after_max_retries(tmp_path):
+    good = FlakySink(failures=0)
+    bad = FlakySink(failures=99)
+    bad.name = "bad"
+    dead = tmp_path / "failed"
+    pipeline = OutputPipeline([good, bad], max_retries=2, fsync=False, dead_letter_dir=str(dead))
+    pipeline.submit(make_items(2), "20261001_000000")
+    pipeline.close()
+
+    saved = json.loads((dead / "bad_20261001_000000.json").read_text(encoding="utf-8"))
+    assert [item["title"] for item in saved] == ["t1", "t2"]
+    assert good.written == ["20261001_000000"]
+    # 部分输出端失败的快照不计入成功写入
+    assert pipeline.stats["written"] == 0
+    assert pipeline.stats["failed"] == 1
+
+
+def test_submit_after_close_writes_synchronously():
+    sink = FlakySink(failures=0)
+    pipeline = OutputPipeline([sink], fsync=False)
+    pipeline.close()
+    pipeline.submit(make_items(1), "20261001_000001")
+    assert sink.written == ["20261001_000001"]
+
+
+class HungSink(Sink):
+    name = "hung"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def write(self, snapshot, batch):
+        self.release.wait(10)
+
+
+def test_close_respects_timeout_when_sink_hangs():
+    sink = HungSink()
+    pipeline = OutputPipeline([sink], queue_size=1, max_workers=1, fsync=False)
+    try:
+        pipeline.submit(make_items(1), "20261001_000000")
+        # 写入线程取走第一个快照后卡在输出端，第二个快照占满队列
+        while pipeline.queue.qsize():
+            pass
+        pipeline.submit(make_items(1), "20261001_000001")
+        start = time.monotonic()
+        pipeline.close(timeout=0.5)
+        assert time.monotonic() - start < 2
+    finally:
+        sink.release.set()
+
+
+class PartialWriteFile:
+    """写入一半后抛出 ENOSPC 的文件包装"""
+
+    def __init__(self, f):
+        self._f = f
+
+    def write(self, data):
+        self._f.write(data[: len(data) // 2])
+        self._f.flush()
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_ndjson_partial_write_is_rolled_back(tmp_path, monkeypatch):
+    sink = NdjsonSink(str(tmp_path))
+    sink.write(Snapshot(make_items(2, "a"), "20261001_000000"), FsyncBatch(False))
+    path = tmp_path / "tophub_stream_20261001.ndjson"
+
+    real_open = open
+    calls = {"n": 0}
+
+    def failing_once(file, mode="r", *args, **kwargs):
+        f = real_open(file, mode, *args, **kwargs)
+        if mode == "ab" and calls["n"] == 0:
+            calls["n"] += 1
+            return PartialWriteFile(f)
+        return f
+
+    monkeypatch.setattr(tophub_writer, "open", failing_once, raising=False)
+    pipeline = OutputPipeline([sink], max_retries=3, fsync=False)
+    pipeline.submit(make_items(3, "b"), "20261001_000100")
+    pipeline.close()
+
+    titles = [item["title"] for item in read_lines(path)]
+    assert titles == ["a1", "a2", "b1", "b2", "b3"]
+
+
+def test_ndjson_discards_torn_tail_left_by_earlier_failure(tmp_path):
+    path = tmp_path / "tophub_stream_20261001.ndjson"
+    path.write_bytes(b'{"title": "ok"}\n{"title": "tor')
+    sink = NdjsonSink(str(tmp_path))
+    sink.write(Snapshot(make_items(1, "c"), "20261001_000200"), FsyncBatch(False))
+    assert [item["title"] for item in read_lines(path)] == ["ok", "c1"]
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+今日热榜统一命令行 - tophub
+
+    python tophub.py scrape                  # HTTP 模式爬取一次
+    python tophub.py edge                    # Edge 浏览器模式爬取一次
+    python tophub.py service                 # 定时服务
+    python tophub.py replay page.html        # 离线解析已保存的页面
+    python tophub.py importtime              # 检查各子命令的导入开销
+
+计划任务/cron 每次都会启动新进程，因此本文件只导入标准库，
+各子命令在执行时才加载所需的后端 (requests/bs4/lxml/playwright/schedule)。
+"""
+
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("tophub")
+
+
+# 各子命令加载的后端模块
+BACKENDS: Dict[str, List[str]] = {
+    "scrape": ["tophub_scraper"],
+    "edge": ["tophub_scraper_edge"],
+    "service": ["tophub_service"],
+    "replay": ["tophub_scraper"],
+}
+
+# 各子命令在启动阶段(发出第一个请求前)不应加载的模块
+FORBIDDEN_IMPORTS: Dict[str, List[str]] = {
+    "cli": ["requests", "urllib3", "bs4", "lxml", "playwright", "schedule", "httpx"],
+    "scrape": ["bs4", "lxml", "playwright", "schedule", "httpx"],
+    "edge": ["requests", "urllib3", "bs4", "lxml", "schedule", "httpx"],
+    "service": ["playwright", "httpx"],
+    "replay": ["requests", "urllib3", "bs4", "lxml", "playwright", "schedule", "httpx"],
+}
+
+
+def _setup_logging(verbose: bool = False):
+    logging.basicConfig(
+        level=logging.DEBUG if verbose else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def _load_config(args):
+    """加载 --config 指定的配置文件(默认为存在时的 config.py)"""
+    from tophub_config import find_config, load_config
+    return load_config(find_config(args.config))
+
+
+def _save_and_preview(scraper, items, output_dir: str, formats: List[str]):
+    """保存结果并打印预览"""
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if "json" in formats:
+        scraper.save_to_json(items, os.path.join(output_dir, f"tophub_{timestamp}.json"))
+    if "csv" in formats:
+        scraper.save_to_csv(items, os.path.join(output_dir, f"tophub_{timestamp}.csv"))
+
+    print("\n=== 数据预览 (前10条) ===")
+    for item in items[:10]:
+        heat_str = f" (热度: {item.heat})" if item.heat else ""
+        print(f"[{item.platform}] #{item.ranking} {item.title[:50]}...{heat_str}")
+    print(f"\n共获取 {len(items)} 条数据")
+
+
+# ============ 子命令 ============
+
+def cmd_scrape(args) -> int:
+    from tophub_scraper import TopHubScraper
+
+    # 命令行参数优先于配置文件，与配置文件使用相同的校验
+    config = _load_config(args)
+    overrides = {
+        "delay_range": args.delay, "max_retries": args.retries, "timeout": args.timeout,
+        "proxy_pool": args.proxy, "transport": args.transport, "urls": args.url,
+    }
+    config = config.with_overrides(
+        {k: v for k, v in overrides.items() if v is not None}, source="命令行参数"
+    )
+
+    scraper = TopHubScraper.from_config(config)
+    items = scraper.scrape(config.urls)
+    if not items:
+        print("未获取到数据")
+        return 1
+    _save_and_preview(scraper, items, args.output or config.resolve_output_dir(), args.format)
+    return 0
+
+
+def cmd_edge(args) -> int:
+    import asyncio
+    from tophub_scraper_edge import TopHubEdgeScraper
+
+    overrides = {"page_timeout": args.wait, "max_tabs": args.tabs, "urls": args.url}
+    if args.no_headless:
+        overrides["headless"] = False
+    config = _load_config(args).with_overrides(
+        {k: v for k, v in overrides.items() if v is not None}, source="命令行参数"
+    )
+    scraper = TopHubEdgeScraper.from_config(config)
+    urls = config.urls
+
+    async def run():
+        async with scraper:
+            if urls:
+                # 多个分类页面在同一浏览器上下文中并行打开标签页
+                return await scraper.scrape_many(urls)
+            return await scraper.scrape()
+
+    items = asyncio.run(run())
+    if not items:
+        print("未获取到数据")
+        return 1
+    _save_and_preview(scraper, items, args.output or config.resolve_output_dir(), args.format)
+    return 0
+
+
+def cmd_service(args) -> int:
+    import tophub_service
+    from tophub_config import find_config, load_config
+
+    config_path = find_config(args.config)
+    config = load_config(config_path)
+    # 命令行参数直接传给服务，这里只做与配置文件相同的校验
+    overrides = {
+        "schedule_interval": args.interval, "urls": args.url,
+        "feed_port": args.feed_port, "webhooks": args.webhook,
+    }
+    config.with_overrides({k: v for k, v in overrides.items() if v is not None}, source="命令行参数")
+    tophub_service.setup_logging(config.resolve_log_dir())
+    service = tophub_service.TopHubService(
+        feed_port=args.feed_port,
+        webhooks=args.webhook,
+        urls=args.url,
+        output_dir=args.output,
+        config_path=config_path
+    )
+    try:
+        if args.once:
+            service.run_once()
+        else:
+            print("按 Ctrl+C 停止服务")
+            service.run_scheduler(interval_hours=args.interval)
+    except KeyboardInterrupt:
+        print("\n服务已停止")
+    finally:
+        service.stop()
+    return 0
+
+
+def cmd_replay(args) -> int:
+    """离线解析已保存的 HTML，用于调试选择器和复现解析问题"""
+    from tophub_scraper import TopHubScraper
+
+    scraper = TopHubScraper()
+    items = []
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            items.extend(scraper.iter_parse(f.read()))
+    if not items:
+        print("未解析到数据")
+        return 1
+    if args.output:
+        _save_and_preview(scraper, items, args.output, args.format)
+    else:
+        for item in items:
+            print(f"[{item.platform}] #{item.ranking} {item.title}")
+        print(f"\n共解析 {len(items)} 条数据")
+    return 0
+
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    """解析 -X importtime 输出: {模块名: 累计微秒}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        modules[parts[2].strip()] = int(parts[1].strip())
+    return modules
+
+
+def check_import_time(command: str, budget_ms: Optional[float] = None) -> Dict:
+    """
+    在子进程中用 -X importtime 测量子命令启动时的导入
+
+    "cli" 只导入本文件；其余子命令额外导入对应的后端模块。
+    """
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = "import tophub"
+    for module in BACKENDS.get(command, []):
+        code += f"; import {module}"
+    if command == "scrape":
+        # HTTP 模式发出第一个请求前需要创建传输层
+        code += "; tophub_scraper.TopHubScraper().transport"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=here, capture_output=True, text=True
+    )
+    return _summarize_import_time(command, proc.stderr, proc.returncode, budget_ms)
+
+
+def _summarize_import_time(command: str, stderr: str, returncode: int,
+                           budget_ms: Optional[float] = None) -> Dict:
+    """根据 -X importtime 子进程的输出判断子命令是否通过"""
+    modules = _parse_importtime(stderr)
+    top_level = {name.split(".")[0] for name in modules}
+    forbidden = sorted(top_level & set(FORBIDDEN_IMPORTS.get(command, [])))
+    total_ms = sum(
+        us for name, us in modules.items() if "." not in name
+    ) / 1000
+    result = {
+        "command": command,
+        "ok": returncode == 0 and not forbidden and (budget_ms is None or total_ms <= budget_ms),
+        "skipped": False,
+        "total_ms": round(total_ms, 1),
+        "forbidden": forbidden,
+        "slowest": sorted(
+            ((name, round(us / 1000, 1)) for name, us in modules.items() if "." not in name),
+            key=lambda x: -x[1]
+        )[:5]
+    }
+    if returncode != 0:
+        # 后端依赖未安装(例如 playwright)时跳过
+        if "ModuleNotFoundError" in stderr:
+            result.update(ok=True, skipped=True)
+        result["error"] = stderr.strip().splitlines()[-1] if stderr.strip() else ""
+    return result
+
+
+def cmd_importtime(args) -> int:
+    commands = ["cli", *BACKENDS] if args.command == "all" else [args.command]
+    failed = False
+    for command in commands:
+        result = check_import_time(command, args.budget_ms)
+        if result["skipped"]:
+            # --strict 时依赖缺失也算失败，避免所有后端都被跳过时检查仍然通过
+            print(f"[{'失败' if args.strict else '跳过'}] {command}: {result.get('error')}")
+            failed = failed or args.strict
+            continue
+        status = "通过" if result["ok"] else "失败"
+        print(f"[{status}] {command}: 导入耗时 {result['total_ms']} ms")
+        if result["forbidden"]:
+            print(f"    不应加载的模块: {', '.join(result['forbidden'])}")
+        if result.get("error"):
+            print(f"    错误: {result['error']}")
+        for name, ms in result["slowest"]:
+            print(f"    {name}: {ms} ms")
+        failed = failed or not result["ok"]
+    return 1 if failed else 0
+
+
+# ============ 参数 ============
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="tophub", description="今日热榜爬虫")
+    parser.add_argument('--verbose', '-v', action='store_true', help='输出调试日志')
+    parser.add_argument('--config', '-c', help='配置文件（默认为存在时的 config.py）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_output(p):
+        p.add_argument('--output', '-o', help='输出目录（默认为配置的 OUTPUT_DIR）')
+        p.add_argument('--format', nargs='+', choices=['json', 'csv'], default=['json', 'csv'],
+                       help='输出格式')
+
+    scrape = subparsers.add_parser('scrape', help='HTTP 模式爬取一次')
+    scrape.add_argument('--url', action='append', help='爬取的页面(可多次指定，默认新闻分类)')
+    scrape.add_argument('--delay', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        help='请求间隔（秒）')
+    scrape.add_argument('--retries', type=int, help='最大重试次数')
+    scrape.add_argument('--timeout', type=int, help='请求超时（秒）')
+    scrape.add_argument('--proxy', action='append', help='代理地址(可多次指定)')
+    scrape.add_argument('--transport', choices=['requests', 'httpx', 'auto'], help='HTTP 传输层')
+    add_output(scrape)
+    scrape.set_defaults(func=cmd_scrape)
+
+    edge = subparsers.add_parser('edge', help='Edge 浏览器模式爬取一次')
+    edge.add_argument('--no-headless', action='store_true', help='显示浏览器窗口')
+    edge.add_argument('--wait', '-w', type=int, help='页面加载超时（毫秒）')
+    edge.add_argument('--url', action='append', help='爬取的页面(可多次指定，并行打开标签页)')
+    edge.add_argument('--tabs', type=int, help='同时打开的最大标签页数')
+    add_output(edge)
+    edge.set_defaults(func=cmd_edge)
+
+    service = subparsers.add_parser('service', help='定时服务')
+    service.add_argument('--interval', type=float, help='执行间隔（小时，默认为配置的 SCHEDULE_INTERVAL）')
+    service.add_argument('--once', action='store_true', help='只执行一次')
+    service.add_argument('--url', action='append', help='爬取的页面(可多次指定)')
+    service.add_argument('--output', '-o', help='输出目录（默认为配置的 OUTPUT_DIR）')
+    service.add_argument('--feed-port', type=int, help='SSE 变更推送端口')
+    service.add_argument('--webhook', action='append', help='变更推送 Webhook 地址')
+    service.set_defaults(func=cmd_service)
+
+    replay = subparsers.add_parser('replay', help='离线解析已保存的 HTML 页面')
+    replay.add_argument('files', nargs='+', help='HTML 文件')
+    add_output(replay)
+    replay.set_defaults(func=cmd_replay)
+
+    importtime = subparsers.add_parser('importtime', help='检查各子命令的导入开销')
+    importtime.add_argument('command', nargs='?', default='all',
+                            choices=['all', 'cli', *BACKENDS], help='检查的子命令')
+    importtime.add_argument('--budget-ms', type=float, help='导入耗时上限（毫秒），超出即失败')
+    importtime.add_argument('--strict', action='store_true', help='后端依赖未安装时视为失败（CI 使用）')
+    importtime.set_defaults(func=cmd_importtime)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from tophub_config import ConfigError
+
+    args = build_parser().parse_args(argv)
+    if args.command not in ('service', 'importtime'):
+        _setup_logging(args.verbose)
+    try:
+        return args.func(args)
+    except ConfigError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
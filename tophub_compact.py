@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+今日热榜快照压缩与保留 - Compaction & Retention
+
+将每天的多个快照文件 (tophub_YYYYmmdd_HHMMSS.json/csv) 合并为一个
+去重后的压缩 NDJSON 归档，并按保留策略分层清理：
+
+- 原始快照: 保留 raw_days 天，超期且已归档的删除
+- 日归档:   保留 compacted_days 天，超期后降级为每日 Top-N
+- 每日 Top-N: 保留 top_days 天 (None 表示永久)
+
+只处理今天以前、且超过 min_age_seconds 未修改的文件，所有写入均为
+临时文件 + 重命名，可在爬虫写入时安全运行。
+"""
+
+import os
+import re
+import csv
+import gzip
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+RAW_PATTERN = re.compile(r'^tophub_(\d{8})_(\d{6})\.(json|csv)$')
+ARCHIVE_PATTERN = re.compile(r'^tophub_(\d{8})\.ndjson\.gz$')
+TOP_PATTERN = re.compile(r'^tophub_(\d{8})\.top\.json\.gz$')
+
+
+@dataclass
+class CompactionReport:
+    """压缩结果统计"""
+    days_compacted: int = 0
+    raw_files_removed: int = 0
+    archives_demoted: int = 0
+    top_files_removed: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def to_dict(self) -> Dict:
+        return {
+            "days_compacted": self.days_compacted,
+            "raw_files_removed": self.raw_files_removed,
+            "archives_demoted": self.archives_demoted,
+            "top_files_removed": self.top_files_removed,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+            "bytes_reclaimed": self.bytes_reclaimed
+        }
+
+
+def _parse_int(value) -> Optional[int]:
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _read_snapshot(path: str) -> List[Dict]:
+    """读取单个快照文件为条目字典列表"""
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    items = []
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # 表头
+        for row in reader:
+            if len(row) < 6:
+                continue
+            items.append({
+                "platform": row[0],
+                "ranking": _parse_int(row[1]),
+                "title": row[2],
+                "url": row[3],
+                "heat": _parse_int(row[4]),
+                "timestamp": row[5]
+            })
+    return items
+
+
+def _write_gzip_atomic(path: str, lines: Iterator[str]):
+    """写入 gzip 临时文件，fsync 后重命名"""
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as gz:
+                for line in lines:
+                    gz.write(line.encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_archive(path: str) -> Tuple[List[str], List[Dict]]:
+    """
+    读取日归档
+
+    Returns:
+        (快照时间戳列表, 去重条目列表)。条目的 seen 字段为
+        [[快照序号, 排名, 热度], ...]，canonical_url 为解析后的原文地址(可能为 None)
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        entries = [json.loads(line) for line in f if line.strip()]
+    return header["snapshots"], entries
+
+
+def iter_archive_items(path: str) -> Iterator[Dict]:
+    """将日归档展开为逐条快照条目，格式与 JSON 快照一致"""
+    snapshots, entries = read_archive(path)
+    timestamps = [
+        datetime.strptime(ts, "%Y%m%d_%H%M%S").isoformat() for ts in snapshots
+    ]
+    for entry in entries:
+        for idx, ranking, heat in entry["seen"]:
+            yield {
+                "platform": entry["platform"],
+                "ranking": ranking,
+                "title": entry["title"],
+                "url": entry["url"],
+                "heat": heat,
+                "timestamp": timestamps[idx],
+                "canonical_url": entry.get("canonical_url")
+            }
+
+
+class Compactor:
+    """快照压缩与保留管理"""
+
+    def __init__(
+        self,
+        directory: str,                         # 原始快照目录
+        archive_dir: Optional[str] = None,      # 归档目录(默认 directory/tophub_archive)
+        raw_days: int = 7,                      # 原始快照保留天数
+        compacted_days: int = 365,              # 日归档保留天数
+        top_n: int = 10,                        # 降级后每个平台保留的条目数
+        top_days: Optional[int] = None,         # Top-N 保留天数(None 永久)
+        min_age_seconds: int = 300              # 跳过最近修改的文件
+    ):
+        self.directory = directory
+        self.archive_dir = archive_dir or os.path.join(directory, "tophub_archive")
+        self.raw_days = raw_days
+        self.compacted_days = compacted_days
+        self.top_n = top_n
+        self.top_days = top_days
+        self.min_age_seconds = min_age_seconds
+
+    def apply_config(self, config):
+        """应用 TopHubConfig 中的保留策略，下一次压缩时生效"""
+        self.raw_days = config.raw_days
+        self.compacted_days = config.compacted_days
+        self.top_n = config.top_n
+        self.top_days = config.top_days
+
+    def _archive_path(self, day: str) -> str:
+        return os.path.join(self.archive_dir, f"tophub_{day}.ndjson.gz")
+
+    def _top_path(self, day: str) -> str:
+        return os.path.join(self.archive_dir, f"tophub_{day}.top.json.gz")
+
+    def _collect_raw(self, now: datetime) -> Dict[str, Dict[str, List[str]]]:
+        """按天分组原始快照: {day: {snapshot_ts: [path, ...]}}"""
+        today = now.strftime("%Y%m%d")
+        cutoff = now.timestamp() - self.min_age_seconds
+        days: Dict[str, Dict[str, List[str]]] = {}
+        if not os.path.isdir(self.directory):
+            return days
+        for name in os.listdir(self.directory):
+            match = RAW_PATTERN.match(name)
+            if not match:
+                continue
+            day, hms, _ = match.groups()
+            path = os.path.join(self.directory, name)
+            # 今天的文件和最近修改的文件可能仍在写入
+            if day >= today or os.path.getmtime(path) > cutoff:
+                continue
+            days.setdefault(day, {}).setdefault(f"{day}_{hms}", []).append(path)
+        return days
+
+    def compact_day(self, day: str, snapshots: Dict[str, List[str]]) -> Tuple[int, List[str]]:
+        """
+        合并一天的快照到日归档 (可重复执行，已有归档会被合并)
+
+        Returns:
+            (新合并的快照数, 已确认写入归档、可以删除的原始文件)
+        """
+        known: List[str] = []
+        entries: Dict[Tuple[str, str, str], Dict] = {}
+        archive_path = self._archive_path(day)
+        if os.path.exists(archive_path):
+            known, old_entries = read_archive(archive_path)
+            for entry in old_entries:
+                entry["seen"] = [[known[idx], r, h] for idx, r, h in entry["seen"]]
+                entries[(entry["platform"], entry["title"], entry["url"])] = entry
+
+        archived_before = set(known)
+        for ts in sorted(snapshots):
+            if ts in archived_before:
+                continue
+            # 同一快照 JSON 与 CSV 内容相同，优先读取 JSON
+            paths = sorted(snapshots[ts], key=lambda p: not p.endswith('.json'))
+            try:
+                items = _read_snapshot(paths[0])
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取快照失败，跳过: {paths[0]} ({e})")
+                continue
+            known.append(ts)
+            for item in items:
+                key = (item.get("platform"), item.get("title"), item.get("url"))
+                entry = entries.setdefault(key, {
+                    "platform": key[0], "title": key[1], "url": key[2],
+                    "canonical_url": None, "seen": []
+                })
+                entry["seen"].append([ts, item.get("ranking"), item.get("heat")])
+                # CSV 快照和解析失败的轮次没有原文地址，保留已知的最新地址
+                if item.get("canonical_url"):
+                    entry["canonical_url"] = item["canonical_url"]
+
+        added = len(known) - len(archived_before)
+        if added == 0 and archived_before:
+            return 0, [p for ts, paths in snapshots.items() if ts in archived_before for p in paths]
+
+        known.sort()
+        index = {ts: i for i, ts in enumerate(known)}
+
+        def _lines():
+            yield json.dumps({"day": day, "snapshots": known}, ensure_ascii=False) + "\n"
+            for entry in entries.values():
+                seen = sorted(([index[ts], r, h] for ts, r, h in entry["seen"]), key=lambda x: x[0])
+                yield json.dumps({**entry, "seen": seen}, ensure_ascii=False) + "\n"
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        _write_gzip_atomic(archive_path, _lines())
+
+        # 回读校验后才允许删除原始文件
+        archived, _ = read_archive(archive_path)
+        archived = set(archived)
+        return added, [p for ts, paths in snapshots.items() if ts in archived for p in paths]
+
+    def demote_archive(self, day: str):
+        """将日归档降级为每日 Top-N (按当天最佳排名)"""
+        archive_path = self._archive_path(day)
+        _, entries = read_archive(archive_path)
+        best: Dict[str, List[Dict]] = {}
+        for entry in entries:
+            rankings = [r for _, r, _ in entry["seen"] if isinstance(r, int)]
+            heats = [h for _, _, h in entry["seen"] if isinstance(h, int)]
+            best.setdefault(entry["platform"], []).append({
+                "platform": entry["platform"],
+                "title": entry["title"],
+                "url": entry["url"],
+                "canonical_url": entry.get("canonical_url"),
+                "best_ranking": min(rankings) if rankings else None,
+                "max_heat": max(heats) if heats else None,
+                "appearances": len(entry["seen"])
+            })
+        top = []
+        for platform_items in best.values():
+            platform_items.sort(key=lambda x: (
+                x["best_ranking"] is None, x["best_ranking"] or 0, -x["appearances"]
+            ))
+            top.extend(platform_items[:self.top_n])
+
+        _write_gzip_atomic(
+            self._top_path(day),
+            iter([json.dumps({"day": day, "items": top}, ensure_ascii=False)])
+        )
+        os.remove(archive_path)
+
+    def run(self, now: Optional[datetime] = None) -> CompactionReport:
+        """执行一次压缩与保留清理"""
+        now = now or datetime.now()
+        report = CompactionReport()
+        raw_cutoff = (now - timedelta(days=self.raw_days)).strftime("%Y%m%d")
+        compacted_cutoff = (now - timedelta(days=self.compacted_days)).strftime("%Y%m%d")
+        top_cutoff = (
+            (now - timedelta(days=self.top_days)).strftime("%Y%m%d")
+            if self.top_days is not None else None
+        )
+
+        # 1. 合并原始快照，超过保留期的删除
+        for day, snapshots in sorted(self._collect_raw(now).items()):
+            archive_path = self._archive_path(day)
+            before = sum(os.path.getsize(p) for paths in snapshots.values() for p in paths)
+            before += os.path.getsize(archive_path) if os.path.exists(archive_path) else 0
+            try:
+                added, removable = self.compact_day(day, snapshots)
+            except (OSError, ValueError) as e:
+                logger.error(f"压缩 {day} 失败: {e}")
+                continue
+            if added:
+                report.days_compacted += 1
+
+            if day < raw_cutoff:
+                for path in removable:
+                    try:
+                        os.remove(path)
+                        report.raw_files_removed += 1
+                    except OSError as e:
+                        logger.warning(f"删除原始快照失败: {path} ({e})")
+            after = os.path.getsize(archive_path) + sum(
+                os.path.getsize(p) for paths in snapshots.values() for p in paths
+                if os.path.exists(p)
+            )
+            report.bytes_before += before
+            report.bytes_after += after
+
+        # 2. 日归档超期降级为 Top-N，Top-N 超期删除
+        if os.path.isdir(self.archive_dir):
+            for name in sorted(os.listdir(self.archive_dir)):
+                path = os.path.join(self.archive_dir, name)
+                archive_match = ARCHIVE_PATTERN.match(name)
+                top_match = TOP_PATTERN.match(name)
+                if archive_match and archive_match.group(1) < compacted_cutoff:
+                    day = archive_match.group(1)
+                    before = os.path.getsize(path)
+                    try:
+                        self.demote_archive(day)
+                    except (OSError, ValueError) as e:
+                        logger.error(f"降级归档 {day} 失败: {e}")
+                        continue
+                    report.archives_demoted += 1
+                    report.bytes_before += before
+                    report.bytes_after += os.path.getsize(self._top_path(day))
+                elif top_match and top_cutoff and top_match.group(1) < top_cutoff:
+                    report.bytes_before += os.path.getsize(path)
+                    os.remove(path)
+                    report.top_files_removed += 1
+
+        logger.info(
+            f"压缩完成: 合并 {report.days_compacted} 天，删除原始快照 {report.raw_files_removed} 个，"
+            f"降级归档 {report.archives_demoted} 个，回收 {report.bytes_reclaimed / 1024 / 1024:.2f} MB"
+        )
+        return report
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='今日热榜快照压缩与保留')
+    parser.add_argument('directory', nargs='?',
+                        default=os.path.join(os.path.expanduser("~"), "Desktop"),
+                        help='原始快照目录（默认桌面）')
+    parser.add_argument('--archive-dir', help='归档目录')
+    parser.add_argument('--raw-days', type=int, default=7, help='原始快照保留天数')
+    parser.add_argument('--compacted-days', type=int, default=365, help='日归档保留天数')
+    parser.add_argument('--top-n', type=int, default=10, help='降级后每个平台保留条目数')
+    parser.add_argument('--top-days', type=int, default=None, help='Top-N 保留天数（默认永久）')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    report = Compactor(
+        args.directory,
+        archive_dir=args.archive_dir,
+        raw_days=args.raw_days,
+        compacted_days=args.compacted_days,
+        top_n=args.top_n,
+        top_days=args.top_days
+    ).run()
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
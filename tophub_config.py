@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+今日热榜运行配置 - Config
+
+从 config.py (格式见 config.example.py) 读取配置并校验，
+供 TopHubScraper、TopHubEdgeScraper 和 TopHubService 使用。
+ConfigWatcher 监视配置文件，修改后自动重新加载；
+校验失败时保留原配置并记录错误，服务不会因配置写错而中断。
+"""
+
+import os
+import runpy
+import logging
+import threading
+from dataclasses import dataclass, field, fields, replace
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.py")
+
+# 修改后需要重启服务才生效的配置项，其余配置项在服务运行中即时生效
+RESTART_REQUIRED = {
+    "transport", "output_dir", "save_to_desktop", "log_dir", "feed_port", "webhooks",
+    "headless", "window_size", "page_timeout", "user_data_dir", "max_tabs", "tab_timeout",
+}
+
+
+class ConfigError(ValueError):
+    """配置校验失败"""
+
+    def __init__(self, errors: List[str], path: Optional[str] = None):
+        self.errors = errors
+        self.path = path
+        where = f" ({path})" if path else ""
+        super().__init__(f"配置无效{where}: " + "; ".join(errors))
+
+
+@dataclass(frozen=True)
+class TopHubConfig:
+    """运行配置，字段名为配置文件中变量名的小写形式"""
+    # 爬虫
+    delay_range: Tuple[float, float] = (2, 3)     # 请求间隔范围(秒)
+    max_retries: int = 3                          # 最大重试次数
+    timeout: int = 30                             # 请求超时(秒)
+    proxy_pool: Tuple[str, ...] = ()              # 代理池
+    user_agents: Tuple[str, ...] = ()             # User-Agent 轮换列表(空则使用默认请求头)
+    random_ua: bool = False                       # 每次请求随机选择 User-Agent
+    transport: str = "requests"                   # HTTP 传输层: requests / httpx / auto
+    urls: Optional[Tuple[str, ...]] = None        # 爬取的分类/节点页面(None 为默认新闻分类)
+    link_workers: int = 16                        # 跳转链接并发解析数
+    # Edge 浏览器
+    headless: bool = True
+    window_size: Tuple[int, int] = (1920, 1080)
+    page_timeout: int = 30000                     # 页面加载超时(毫秒)
+    user_data_dir: Optional[str] = None
+    max_tabs: int = 4                             # 并行爬取多个页面时的最大标签页数
+    tab_timeout: float = 90                       # 单个标签页总超时(秒)
+    # 输出
+    output_dir: Optional[str] = None              # 输出目录(None 为桌面)
+    save_to_desktop: bool = False                 # 为 True 时忽略 output_dir，保存到桌面
+    log_dir: Optional[str] = None                 # 日志目录(None 为 桌面/TopHubLogs)
+    # 定时任务
+    schedule_interval: float = 2                  # 爬取间隔(小时)
+    compact_at: str = "03:30"                     # 每日压缩时间
+    raw_days: int = 7                             # 原始快照保留天数
+    compacted_days: int = 365                     # 日归档保留天数，超期后降级为每日 Top-N
+    top_n: int = 10                               # 降级后每个平台保留的条目数
+    top_days: Optional[int] = None                # Top-N 保留天数(None 永久)
+    # 变更推送
+    feed_port: Optional[int] = None               # SSE 端口(None 不启动)
+    webhooks: Tuple[str, ...] = ()
+    # 配置文件所在目录，配置中的相对路径以此为基准(None 为当前工作目录)；不是配置项
+    base_dir: Optional[str] = field(default=None, compare=False)
+
+    @classmethod
+    def from_mapping(cls, values: Mapping[str, Any], path: Optional[str] = None) -> "TopHubConfig":
+        """
+        从配置变量创建配置
+
+        只读取全大写的变量(与 config.example.py 一致)，未知变量记录警告后忽略。
+        path 为配置文件路径时，配置中的相对目录以配置文件所在目录为基准。
+        """
+        known = set(_VALIDATORS)
+        kwargs = {}
+        for key, value in values.items():
+            if not key.isupper() or key.startswith("_"):
+                continue
+            name = key.lower()
+            if name not in known:
+                logger.warning(f"忽略未知配置项: {key}")
+                continue
+            kwargs[name] = value
+
+        base = cls(base_dir=os.path.dirname(os.path.abspath(path)) if path else None)
+        return base.with_overrides(kwargs, path)
+
+    def with_overrides(self, values: Mapping[str, Any], source: Optional[str] = None) -> "TopHubConfig":
+        """
+        返回覆盖部分配置项后的新配置(如命令行参数)，与配置文件使用相同的校验
+
+        Args:
+            values: {字段名: 值}，字段名为小写
+            source: 出错时在 ConfigError 中显示的来源
+
+        Raises:
+            ConfigError: 校验失败
+        """
+        errors = []
+        config = self
+        for name, value in values.items():
+            try:
+                config = replace(config, **{name: _normalize(name, value)})
+            except (TypeError, ValueError) as e:
+                errors.append(f"{name.upper()}: {e}")
+        errors.extend(config.validate())
+        if errors:
+            raise ConfigError(errors, source)
+        return config
+
+    def validate(self) -> List[str]:
+        """返回各字段之间的校验错误"""
+        errors = []
+        if self.delay_range[0] > self.delay_range[1]:
+            errors.append(f"DELAY_RANGE: 最小值大于最大值 {self.delay_range}")
+        if self.random_ua and not self.user_agents:
+            errors.append("RANDOM_UA: 已启用但 USER_AGENTS 为空")
+        if self.compacted_days < self.raw_days:
+            errors.append(f"COMPACTED_DAYS: 不应小于 RAW_DAYS ({self.compacted_days} < {self.raw_days})")
+        return errors
+
+    def diff(self, other: "TopHubConfig") -> Set[str]:
+        """返回与另一份配置不同的字段名"""
+        return {
+            f.name for f in fields(self)
+            if f.compare and getattr(self, f.name) != getattr(other, f.name)
+        }
+
+    def resolve_path(self, path: str) -> str:
+        """展开 ~，相对路径以配置文件所在目录为基准"""
+        path = os.path.expanduser(path)
+        if self.base_dir:
+            path = os.path.join(self.base_dir, path)
+        return os.path.abspath(path)
+
+    def resolve_output_dir(self) -> str:
+        if self.save_to_desktop or not self.output_dir:
+            return os.path.join(os.path.expanduser("~"), "Desktop")
+        return self.resolve_path(self.output_dir)
+
+    def resolve_log_dir(self) -> str:
+        if not self.log_dir:
+            return os.path.join(os.path.expanduser("~"), "Desktop", "TopHubLogs")
+        return self.resolve_path(self.log_dir)
+
+    def resolve_user_data_dir(self) -> Optional[str]:
+        return self.resolve_path(self.user_data_dir) if self.user_data_dir else None
+
+
+# ============ 字段校验 ============
+
+def _number(value, minimum: float, integer: bool = False, exclusive: bool = False):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f"应为数字，实际为 {value!r}")
+    if integer and int(value) != value:
+        raise ValueError(f"应为整数，实际为 {value!r}")
+    if value < minimum or (exclusive and value == minimum):
+        raise ValueError(f"应{'大于' if exclusive else '不小于'} {minimum}，实际为 {value!r}")
+    return int(value) if integer else value
+
+
+def _boolean(value) -> bool:
+    if not isinstance(value, bool):
+        raise TypeError(f"应为 True/False，实际为 {value!r}")
+    return value
+
+
+def _string_list(value, schemes: Optional[Set[str]] = None) -> Tuple[str, ...]:
+    if isinstance(value, str) or not isinstance(value, (list, tuple)):
+        raise TypeError(f"应为列表，实际为 {value!r}")
+    result = []
+    for entry in value:
+        if not isinstance(entry, str) or not entry.strip():
+            raise ValueError(f"列表项应为非空字符串，实际为 {entry!r}")
+        entry = entry.strip()
+        if schemes is not None:
+            parsed = urlparse(entry)
+            if parsed.scheme not in schemes or not parsed.netloc:
+                raise ValueError(f"地址格式错误: {entry!r} (支持 {'/'.join(sorted(schemes))})")
+        result.append(entry)
+    return tuple(result)
+
+
+def _pair(value, integer: bool, minimum: float, exclusive: bool):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise TypeError(f"应为两个数字组成的元组，实际为 {value!r}")
+    return tuple(_number(v, minimum, integer, exclusive) for v in value)
+
+
+def _optional_string(value) -> Optional[str]:
+    if value is not None and not isinstance(value, str):
+        raise TypeError(f"应为字符串或 None，实际为 {value!r}")
+    return value or None
+
+
+def _compact_time(value) -> str:
+    if not isinstance(value, str):
+        raise TypeError(f"应为 HH:MM 格式字符串，实际为 {value!r}")
+    hour, sep, minute = value.partition(":")
+    if not (sep and hour.isdigit() and minute.isdigit() and len(minute) == 2
+            and int(hour) < 24 and int(minute) < 60):
+        raise ValueError(f"应为 HH:MM 格式，实际为 {value!r}")
+    return f"{int(hour):02d}:{minute}"
+
+
+def _transport(value) -> str:
+    if value not in ("requests", "httpx", "auto"):
+        raise ValueError(f"应为 requests / httpx / auto，实际为 {value!r}")
+    return value
+
+
+def _port(value) -> Optional[int]:
+    if value is None:
+        return None
+    port = _number(value, 1, integer=True)
+    if port > 65535:
+        raise ValueError(f"端口应在 1-65535 之间，实际为 {value!r}")
+    return port
+
+
+_HTTP = {"http", "https"}
+
+_VALIDATORS: Dict[str, Callable[[Any], Any]] = {
+    "delay_range": lambda v: _pair(v, integer=False, minimum=0, exclusive=False),
+    "max_retries": lambda v: _number(v, 1, integer=True),
+    "timeout": lambda v: _number(v, 0, exclusive=True),
+    "proxy_pool": lambda v: _string_list(v, {"http", "https", "socks5", "socks5h"}),
+    "user_agents": _string_list,
+    "random_ua": _boolean,
+    "transport": _transport,
+    "urls": lambda v: None if v is None else (_string_list(v, _HTTP) or None),
+    "link_workers": lambda v: _number(v, 1, integer=True),
+    "headless": _boolean,
+    "window_size": lambda v: _pair(v, integer=True, minimum=1, exclusive=False),
+    "page_timeout": lambda v: _number(v, 0, integer=True, exclusive=True),
+    "user_data_dir": _optional_string,
+    "max_tabs": lambda v: _number(v, 1, integer=True),
+    "tab_timeout": lambda v: _number(v, 0, exclusive=True),
+    "output_dir": _optional_string,
+    "save_to_desktop": _boolean,
+    "log_dir": _optional_string,
+    "schedule_interval": lambda v: _number(v, 0, exclusive=True),
+    "compact_at": _compact_time,
+    "raw_days": lambda v: _number(v, 1, integer=True),
+    "compacted_days": lambda v: _number(v, 1, integer=True),
+    "top_n": lambda v: _number(v, 1, integer=True),
+    "top_days": lambda v: None if v is None else _number(v, 1, integer=True),
+    "feed_port": _port,
+    "webhooks": lambda v: _string_list(v, _HTTP),
+}
+
+
+def _normalize(name: str, value):
+    return _VALIDATORS[name](value)
+
+
+# ============ 加载与监视 ============
+
+def find_config(path: Optional[str] = None) -> Optional[str]:
+    """返回要使用的配置文件路径: 显式指定的路径，或存在时的默认 config.py"""
+    if path:
+        return path
+    return DEFAULT_CONFIG_PATH if os.path.exists(DEFAULT_CONFIG_PATH) else None
+
+
+def load_config(path: Optional[str] = None) -> TopHubConfig:
+    """
+    加载配置文件
+
+    Args:
+        path: 配置文件路径；为 None 时返回默认配置
+
+    Raises:
+        ConfigError: 配置文件无法执行或校验失败
+    """
+    if path is None:
+        return TopHubConfig()
+    try:
+        values = runpy.run_path(path)
+    except FileNotFoundError:
+        raise ConfigError(["配置文件不存在"], path)
+    except Exception as e:
+        raise ConfigError([f"执行配置文件出错: {e!r}"], path) from e
+    return TopHubConfig.from_mapping(values, path)
+
+
+class ConfigWatcher:
+    """
+    轮询配置文件修改时间，变化时重新加载并回调
+
+    回调参数为 (旧配置, 新配置, 变化的字段名)。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        config: TopHubConfig,
+        callback: Callable[[TopHubConfig, TopHubConfig, Set[str]], None],
+        interval: float = 5.0       # 检查间隔(秒)
+    ):
+        self.path = path
+        self.config = config
+        self.callback = callback
+        self.interval = interval
+        self.stats = {"reloads": 0, "errors": 0}
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[float, int]]:
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime, st.st_size)
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        """检查一次，配置已变化并应用时返回 True"""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        if signature is None:
+            logger.warning(f"配置文件已删除，保留当前配置: {self.path}")
+            return False
+
+        try:
+            new = load_config(self.path)
+        except ConfigError as e:
+            self.stats["errors"] += 1
+            logger.error(f"重新加载配置失败，保留当前配置: {e}")
+            return False
+
+        changed = self.config.diff(new)
+        if not changed:
+            return False
+        old, self.config = self.config, new
+        self.stats["reloads"] += 1
+        logger.info(f"配置已重新加载，变化的配置项: {', '.join(sorted(n.upper() for n in changed))}")
+        restart = changed & RESTART_REQUIRED
+        if restart:
+            logger.warning(f"以下配置项需重启服务后生效: {', '.join(sorted(n.upper() for n in restart))}")
+        try:
+            self.callback(old, new, changed)
+        except Exception as e:
+            logger.error(f"应用新配置出错: {e}", exc_info=True)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tophub-config", daemon=True)
+        self._thread.start()
+        logger.info(f"监视配置文件: {self.path}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
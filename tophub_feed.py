@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+今日热榜变更推送 - Change Feed
+
+将每次爬取结果与上一次快照比对，生成快照级和条目级变更事件，
+通过本地 SSE 端点和批量 Webhook 推送给下游，替代轮询输出文件。
+
+特性:
+- 突发合并（短时间内多次发布只产生一次比对）
+- 按订阅者过滤平台
+- 背压处理（慢消费者断开，重连后从缓冲区补齐）
+- 有界时间的事件缓冲，支持 Last-Event-ID 断点续传
+"""
+
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+# 事件类型
+EVENT_SNAPSHOT = "snapshot"
+EVENT_ITEM_ADDED = "item.added"
+EVENT_ITEM_REMOVED = "item.removed"
+EVENT_ITEM_RANK_CHANGED = "item.rank_changed"
+EVENT_ITEM_HEAT_CHANGED = "item.heat_changed"
+EVENT_GAP = "gap"
+
+
+@dataclass
+class FeedEvent:
+    """变更事件"""
+    id: int                     # 单调递增的事件ID
+    type: str                   # 事件类型
+    platform: Optional[str]     # 所属平台(快照事件为 None)
+    data: Dict                  # 事件内容
+    created: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "platform": self.platform,
+            "data": self.data,
+            "created": self.created
+        }
+
+    def to_sse(self) -> str:
+        """编码为 SSE 消息"""
+        payload = json.dumps(self.to_dict(), ensure_ascii=False)
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+def _item_key(item) -> Tuple[str, str]:
+    """条目唯一键: 平台 + 链接(无链接时用标题)"""
+    return (item.platform, item.url or item.title)
+
+
+class Subscription:
+    """单个订阅者，持有有界队列"""
+
+    def __init__(self, platforms: Optional[Iterable[str]] = None, maxsize: int = 1000):
+        self.platforms: Optional[Set[str]] = set(platforms) if platforms else None
+        self.queue: "queue.Queue[FeedEvent]" = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+        self.last_id = 0
+
+    def matches(self, event: FeedEvent) -> bool:
+        """平台过滤，快照事件总是推送"""
+        if self.platforms is None or event.platform is None:
+            return True
+        return event.platform in self.platforms
+
+    def offer(self, event: FeedEvent):
+        """非阻塞投递，队列满则标记溢出，由订阅者断开后重连补齐"""
+        if self.overflowed or not self.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+            logger.warning(f"订阅者队列已满，断开连接 (最后事件ID: {self.last_id})")
+
+    def get(self, timeout: float) -> Optional[FeedEvent]:
+        try:
+            event = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        self.last_id = event.id
+        return event
+
+
+class ChangeFeed:
+    """变更事件源：比对快照、缓冲事件、分发给订阅者"""
+
+    def __init__(
+        self,
+        retention_seconds: int = 3600,    # 事件缓冲保留时长(秒)
+        max_events: int = 50000,          # 事件缓冲上限
+        coalesce_seconds: float = 2.0,    # 突发合并窗口(秒)
+        subscriber_queue_size: int = 1000  # 每个订阅者的队列长度
+    ):
+        self.retention_seconds = retention_seconds
+        self.max_events = max_events
+        self.coalesce_seconds = coalesce_seconds
+        self.subscriber_queue_size = subscriber_queue_size
+
+        self._lock = threading.Lock()
+        self._events: Deque[FeedEvent] = deque()
+        # 事件ID 以启动时的毫秒时间戳为起点，服务重启后仍单调递增，
+        # 客户端带着重启前的 Last-Event-ID 重连时能识别出中断
+        self._next_id = int(time.time() * 1000)
+        self._state: Dict[Tuple[str, str], Dict] = {}
+        self._pending: Dict[Tuple[str, str], Dict] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._subscribers: List[Subscription] = []
+
+    # ---------- 发布 ----------
+
+    def publish(self, items: List) -> None:
+        """发布一批爬取结果，合并窗口内的多次发布只比对一次"""
+        with self._lock:
+            for item in items:
+                self._pending[_item_key(item)] = item.to_dict()
+            if self.coalesce_seconds <= 0:
+                self._flush_locked()
+                return
+            if self._timer is None:
+                self._timer = threading.Timer(self.coalesce_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> List[FeedEvent]:
+        """立即比对待发布数据并生成事件"""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> List[FeedEvent]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return []
+
+        pending, self._pending = self._pending, {}
+        platforms = {key[0] for key in pending}
+        events: List[FeedEvent] = []
+        counts = {"added": 0, "removed": 0, "changed": 0}
+
+        for key, item in pending.items():
+            old = self._state.get(key)
+            if old is None:
+                events.append(self._new_event(EVENT_ITEM_ADDED, key[0], {"item": item}))
+                counts["added"] += 1
+                continue
+            if old.get("ranking") != item.get("ranking"):
+                events.append(self._new_event(EVENT_ITEM_RANK_CHANGED, key[0], {
+                    "item": item, "previous_ranking": old.get("ranking")
+                }))
+                counts["changed"] += 1
+            if old.get("heat") != item.get("heat"):
+                events.append(self._new_event(EVENT_ITEM_HEAT_CHANGED, key[0], {
+                    "item": item, "previous_heat": old.get("heat")
+                }))
+                counts["changed"] += 1
+
+        # 只对本批出现的平台判定下榜，避免分类分批发布时误判
+        for key in list(self._state):
+            if key[0] in platforms and key not in pending:
+                item = self._state.pop(key)
+                events.append(self._new_event(EVENT_ITEM_REMOVED, key[0], {"item": item}))
+                counts["removed"] += 1
+
+        self._state.update(pending)
+        events.append(self._new_event(EVENT_SNAPSHOT, None, {
+            "platforms": sorted(platforms),
+            "items": len(pending),
+            **counts
+        }))
+
+        self._events.extend(events)
+        self._trim_locked()
+        for subscriber in self._subscribers:
+            for event in events:
+                subscriber.offer(event)
+
+        logger.info(
+            f"变更推送: 新增 {counts['added']}，下榜 {counts['removed']}，"
+            f"变化 {counts['changed']}，订阅者 {len(self._subscribers)}"
+        )
+        return events
+
+    def _new_event(self, event_type: str, platform: Optional[str], data: Dict) -> FeedEvent:
+        event = FeedEvent(id=self._next_id, type=event_type, platform=platform, data=data)
+        self._next_id += 1
+        return event
+
+    def _trim_locked(self):
+        """按时间和数量裁剪事件缓冲"""
+        cutoff = time.time() - self.retention_seconds
+        while self._events and (
+            len(self._events) > self.max_events or self._events[0].created < cutoff
+        ):
+            self._events.popleft()
+
+    # ---------- 订阅 ----------
+
+    def subscribe(
+        self,
+        platforms: Optional[Iterable[str]] = None,
+        last_event_id: Optional[int] = None
+    ) -> Tuple[List[FeedEvent], Subscription]:
+        """
+        注册订阅者
+
+        Returns:
+            (需要补发的历史事件, 订阅对象)。若 last_event_id 早于缓冲区，
+            或不是本进程发出的ID(大于当前最新ID，例如来自时钟回拨前的进程)，
+            补发列表以一个 gap 事件开头，提示客户端需要全量刷新。
+        """
+        subscription = Subscription(platforms, self.subscriber_queue_size)
+        with self._lock:
+            self._trim_locked()
+            replay: List[FeedEvent] = []
+            if last_event_id is not None:
+                oldest = self._events[0].id if self._events else self._next_id
+                unknown = last_event_id >= self._next_id
+                if unknown or last_event_id + 1 < oldest:
+                    replay.append(FeedEvent(id=oldest - 1, type=EVENT_GAP, platform=None, data={
+                        "last_event_id": last_event_id, "oldest_available": oldest
+                    }))
+                since = oldest - 1 if unknown else last_event_id
+                replay.extend(
+                    e for e in self._events if e.id > since and subscription.matches(e)
+                )
+            self._subscribers.append(subscription)
+        if replay:
+            subscription.last_id = replay[-1].id
+        return replay, subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    @property
+    def last_event_id(self) -> int:
+        with self._lock:
+            return self._next_id - 1
+
+    def snapshot(self, platforms: Optional[Iterable[str]] = None) -> Dict:
+        """当前全量状态，供 gap 后的客户端刷新"""
+        wanted = set(platforms) if platforms else None
+        with self._lock:
+            items = [
+                item for key, item in self._state.items()
+                if wanted is None or key[0] in wanted
+            ]
+            last_id = self._next_id - 1
+        return {"last_event_id": last_id, "items": items}
+
+    def close(self):
+        """取消合并定时器并推送剩余数据"""
+        self.flush()
+
+
+def _parse_platforms(values: List[str]) -> Optional[List[str]]:
+    """解析 ?platform=知乎,微博&platform=百度"""
+    platforms = [p.strip() for v in values for p in v.split(",") if p.strip()]
+    return platforms or None
+
+
+class FeedServer:
+    """本地 SSE 服务
+
+    GET /events?platform=知乎,微博   事件流(支持 Last-Event-ID 请求头)
+    GET /snapshot?platform=知乎      当前全量状态
+    """
+
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        keepalive_seconds: float = 15.0
+    ):
+        self.feed = feed
+        self.keepalive_seconds = keepalive_seconds
+        self._stopping = threading.Event()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.httpd.server_address[:2]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug("SSE " + format % args)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                platforms = _parse_platforms(query.get("platform", []))
+                if parsed.path == "/events":
+                    self._stream(platforms, query)
+                elif parsed.path == "/snapshot":
+                    body = json.dumps(server.feed.snapshot(platforms), ensure_ascii=False)
+                    self._send_json(body.encode("utf-8"))
+                else:
+                    self.send_error(404)
+
+            def _send_json(self, body: bytes):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, platforms, query):
+                last_id = self.headers.get("Last-Event-ID") or (query.get("last_event_id") or [None])[0]
+                try:
+                    last_id = int(last_id) if last_id is not None else None
+                except ValueError:
+                    last_id = None
+
+                replay, subscription = server.feed.subscribe(platforms, last_id)
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.send_header("Connection", "keep-alive")
+                    self.end_headers()
+                    self.wfile.write(b"retry: 3000\n\n")
+                    for event in replay:
+                        self.wfile.write(event.to_sse().encode("utf-8"))
+                    self.wfile.flush()
+
+                    while not server._stopping.is_set() and not subscription.overflowed:
+                        event = subscription.get(timeout=server.keepalive_seconds)
+                        if event is None:
+                            self.wfile.write(b": keepalive\n\n")
+                        else:
+                            self.wfile.write(event.to_sse().encode("utf-8"))
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.debug("SSE 客户端已断开")
+                finally:
+                    server.feed.unsubscribe(subscription)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        host, port = self.address
+        logger.info(f"变更推送 SSE 服务已启动: http://{host}:{port}/events")
+
+    def stop(self):
+        self._stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        logger.info("变更推送 SSE 服务已停止")
+
+
+class WebhookDispatcher:
+    """批量 Webhook 推送，失败时指数退避重试，溢出后从缓冲区补齐"""
+
+    def __init__(
+        self,
+        feed: ChangeFeed,
+        url: str,
+        platforms: Optional[Iterable[str]] = None,
+        batch_interval: float = 5.0,    # 批次合并窗口(秒)
+        max_batch: int = 500,           # 单批最大事件数
+        max_retries: int = 5,
+        timeout: int = 10
+    ):
+        self.feed = feed
+        self.url = url
+        self.platforms = list(platforms) if platforms else None
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.last_delivered_id: Optional[int] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        # 从当前位置开始推送，之后的失败批次可从缓冲区补齐
+        if self.last_delivered_id is None:
+            self.last_delivered_id = self.feed.last_event_id
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info(f"Webhook 推送已启动: {self.url}")
+
+    def stop(self, timeout: float = 10.0):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        import requests
+
+        session = requests.Session()
+        while not self._stopping.is_set():
+            replay, subscription = self.feed.subscribe(self.platforms, self.last_delivered_id)
+            # gap 事件随批次推送，接收方据此调用 /snapshot 全量刷新
+            for event in replay:
+                if event.type == EVENT_GAP:
+                    logger.error(
+                        f"Webhook 推送中断超过事件缓冲时长，丢失事件 "
+                        f"{event.data['last_event_id'] + 1}-{event.data['oldest_available'] - 1}: {self.url}"
+                    )
+            batch = list(replay)
+            delivered = True
+            try:
+                while delivered and not self._stopping.is_set() and not subscription.overflowed:
+                    deadline = time.time() + self.batch_interval
+                    while len(batch) < self.max_batch:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        event = subscription.get(timeout=remaining)
+                        if event is not None:
+                            batch.append(event)
+                    if batch:
+                        delivered = self._deliver(session, batch)
+                        batch = []
+                # 退出前尽量推送已收集的事件
+                if batch and delivered:
+                    self._deliver(session, batch)
+            finally:
+                self.feed.unsubscribe(subscription)
+
+    def _deliver(self, session, batch: List[FeedEvent]) -> bool:
+        """推送一批事件，失败时返回 False，由调用方从 last_delivered_id 重新订阅补齐"""
+        payload = json.dumps(
+            {"events": [e.to_dict() for e in batch]}, ensure_ascii=False
+        ).encode("utf-8")
+        for attempt in range(self.max_retries):
+            try:
+                response = session.post(
+                    self.url,
+                    data=payload,
+                    headers={"Content-Type": "application/json; charset=utf-8"},
+                    timeout=self.timeout
+                )
+                response.raise_for_status()
+                self.last_delivered_id = batch[-1].id
+                logger.info(f"Webhook 推送成功: {self.url} ({len(batch)} 条事件)")
+                return True
+            except Exception as e:
+                backoff_time = 2 ** attempt + random.uniform(0, 1)
+                logger.warning(f"Webhook 推送失败: {e}，退避 {backoff_time:.2f} 秒后重试...")
+                if self._stopping.wait(backoff_time):
+                    break
+        logger.error(f"Webhook 推送达到最大重试次数: {self.url}")
+        return False
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+今日热榜跳转链接解析 - Link Resolver
+
+parse_page 得到的链接多为 https://tophub.today/l/... 跳转链接。
+本模块并发解析其目标地址(只请求 tophub，目标取自重定向的 Location 头，
+不访问第三方站点)，结果写入带 TTL 的持久缓存
+(失败结果使用较短的 TTL 做负缓存)，同一链接跨多次运行只解析一次。
+解析请求与爬虫共用代理池和 User-Agent 轮换，并按主机限速；
+429/5xx 按 Retry-After 退避重试，重试用尽后不缓存，下一轮重新解析。
+"""
+
+import re
+import math
+import time
+import random
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from email.utils import parsedate_to_datetime
+from urllib.parse import urljoin, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+REDIRECT_PREFIX = "https://tophub.today/l/"
+
+# 跳转页面中可能出现的目标地址
+_META_REFRESH = re.compile(
+    r'<meta[^>]+http-equiv=["\']?refresh["\']?[^>]+content=["\'][^"\']*url=([^"\'>]+)', re.I
+)
+_JS_LOCATION = re.compile(r'(?:window\.)?location(?:\.href)?\s*=\s*["\']([^"\']+)["\']', re.I)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://tophub.today/"
+}
+
+
+class LinkCache:
+    """SQLite 持久缓存: url -> 最终地址 (None 表示解析失败的负缓存)"""
+
+    def __init__(self, db_path: str):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS links (
+                url TEXT PRIMARY KEY,
+                canonical TEXT,
+                resolved_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get_many(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        """返回未过期的缓存结果，未命中的链接不在结果中"""
+        now = time.time()
+        found: Dict[str, Optional[str]] = {}
+        with self._lock:
+            # 分批查询，避免超过 SQLite 参数数量上限
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT url, canonical FROM links WHERE expires_at > ? "
+                    f"AND url IN ({','.join('?' * len(chunk))})",
+                    [now, *chunk]
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, results: List[Tuple[str, Optional[str], float]]):
+        """写入 (url, 最终地址, ttl秒)"""
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO links (url, canonical, resolved_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(url, canonical, now, now + ttl) for url, canonical, ttl in results]
+            )
+
+    def purge_expired(self) -> int:
+        with self._lock, self.conn:
+            return self.conn.execute(
+                "DELETE FROM links WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class HostThrottle:
+    """按主机限制请求间隔；收到 Retry-After 后该主机的后续请求一起推迟"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str, max_wait: Optional[float] = None) -> bool:
+        """等待到该主机的下一个请求时刻；需要等待超过 max_wait 秒时不占用并返回 False"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            if max_wait is not None and slot - now > max_wait:
+                return False
+            self._next[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return True
+
+    def defer(self, host: str, seconds: float):
+        """该主机至少 seconds 秒后才能再次请求"""
+        with self._lock:
+            self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + seconds)
+
+
+class _RetryLater(Exception):
+    """服务端限流或暂时不可用(429/5xx)"""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(status)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LinkResolver:
+    """并发解析跳转链接"""
+
+    MAX_HOPS = 5    # 同一主机内最多跟随的重定向次数
+
+    def __init__(
+        self,
+        cache_path: str,
+        max_workers: int = 16,                  # 并发解析数(同时也是连接池大小)
+        ttl: int = 30 * 24 * 3600,              # 成功结果缓存时长(秒)
+        negative_ttl: int = 3600,               # 失败结果缓存时长(秒)
+        timeout: int = 10,
+        headers: Optional[Dict[str, str]] = None,
+        proxy_pool: Optional[List[str]] = None, # 代理池(与爬虫共用，轮换使用)
+        user_agents: Optional[List[str]] = None,  # User-Agent 轮换列表
+        random_ua: bool = False,
+        host_interval: float = 0.2,             # 同一主机两次请求的最小间隔(秒)
+        max_retries: int = 3,                   # 429/5xx/代理错误的最大尝试次数
+        max_retry_after: float = 60,            # 单次退避上限(秒)，超过则留到下一轮
+        redirect_prefix: str = REDIRECT_PREFIX  # 需要解析的跳转链接前缀(压测时指向模拟服务器)
+    ):
+        import requests
+
+        self.cache = LinkCache(cache_path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.redirect_prefix = redirect_prefix
+        self.throttle = HostThrottle(host_interval)
+        self.proxy_pool = list(proxy_pool or [])
+        self.user_agents = list(user_agents or [])
+        self.random_ua = random_ua
+        self._rotation_lock = threading.Lock()
+        self._proxy_index = 0
+        self._ua_index = 0
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        self.set_max_workers(max_workers)
+        self.stats = {"hits": 0, "misses": 0, "resolved": 0, "failed": 0, "deferred": 0}
+
+    def set_max_workers(self, max_workers: int):
+        """调整并发解析数，不应在 resolve 进行中调用"""
+        from requests.adapters import HTTPAdapter
+
+        self.max_workers = max_workers
+        # 连接池与并发数一致，tophub.today 的连接在各线程间复用
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        for prefix in ("https://", "http://"):
+            old = self.session.adapters.get(prefix)
+            self.session.mount(prefix, adapter)
+            if old is not None and old is not adapter:
+                old.close()
+
+    def apply_config(self, config):
+        """应用 TopHubConfig 中的代理池和 User-Agent 配置，下一次请求时生效"""
+        with self._rotation_lock:
+            if list(config.proxy_pool) != self.proxy_pool:
+                self.proxy_pool = list(config.proxy_pool)
+                self._proxy_index = 0
+            if list(config.user_agents) != self.user_agents:
+                self.user_agents = list(config.user_agents)
+                self._ua_index = 0
+            self.random_ua = config.random_ua
+
+    def _next_proxy(self) -> Optional[Dict[str, str]]:
+        with self._rotation_lock:
+            if not self.proxy_pool:
+                return None
+            proxy_url = self.proxy_pool[self._proxy_index % len(self.proxy_pool)]
+            self._proxy_index += 1
+        return {"http": proxy_url, "https": proxy_url}
+
+    def _next_user_agent(self) -> Optional[str]:
+        with self._rotation_lock:
+            if not self.user_agents:
+                return None
+            if self.random_ua:
+                return random.choice(self.user_agents)
+            user_agent = self.user_agents[self._ua_index % len(self.user_agents)]
+            self._ua_index += 1
+        return user_agent
+
+    def is_redirect_link(self, url: str) -> bool:
+        return bool(url) and url.startswith(self.redirect_prefix)
+
+    def _extract_target(self, base_url: str, html: str) -> Optional[str]:
+        """从跳转页面内容中提取目标地址"""
+        for pattern in (_META_REFRESH, _JS_LOCATION):
+            match = pattern.search(html)
+            if match:
+                return urljoin(base_url, match.group(1).strip())
+        return None
+
+    @staticmethod
+    def _retry_after(value: Optional[str]) -> Optional[float]:
+        """解析 Retry-After 头(秒数或 HTTP 日期)"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, when.timestamp() - time.time())
+
+    def _check_status(self, response):
+        if response.status_code == 429 or response.status_code >= 500:
+            raise _RetryLater(response.status_code, self._retry_after(response.headers.get("Retry-After")))
+
+    def _request(self, method: str, url: str, host: str, **kwargs):
+        if not self.throttle.acquire(host, self.max_retry_after):
+            # 主机已被推迟超过上限，留到下一轮
+            raise _RetryLater(0, math.inf)
+        user_agent = self._next_user_agent()
+        return self.session.request(
+            method, url, allow_redirects=False, timeout=self.timeout, proxies=self._next_proxy(),
+            headers={"User-Agent": user_agent} if user_agent else None, **kwargs
+        )
+
+    @staticmethod
+    def _location(url: str, response) -> Optional[str]:
+        """重定向响应的目标地址"""
+        location = response.headers.get("Location")
+        if 300 <= response.status_code < 400 and location:
+            return urljoin(url, location)
+        return None
+
+    def _fetch(self, url: str, host: str) -> Optional[str]:
+        """
+        只请求跳转链接所在主机，不跟随重定向访问目标站点：
+        目标地址取自重定向响应的 Location，不支持 HEAD 或返回跳转页时退回 GET 读取
+        meta refresh / JS 跳转；重定向仍指向同一主机时继续解析，最多 MAX_HOPS 次
+        """
+        for _ in range(self.MAX_HOPS):
+            response = self._request("HEAD", url, host)
+            self._check_status(response)
+            target = self._location(url, response)
+            if target is None:
+                # 只读取页面开头，查找 meta refresh / JS 跳转
+                with self._request("GET", url, host, stream=True) as response:
+                    self._check_status(response)
+                    target = self._location(url, response)
+                    if target is None:
+                        if response.status_code >= 400:
+                            logger.debug(f"解析链接失败 ({response.status_code}): {url}")
+                            return None
+                        chunk = next(response.iter_content(65536, decode_unicode=False), b"")
+                        html = chunk.decode(response.encoding or "utf-8", errors="ignore")
+                        target = self._extract_target(url, html)
+                        if target is None:
+                            return None
+            if urlparse(target).netloc != host:
+                return target
+            url = target
+        logger.debug(f"解析链接重定向次数过多: {url}")
+        return None
+
+    def _resolve_one(self, url: str) -> Tuple[Optional[str], bool]:
+        """
+        解析单个链接，返回 (最终地址, 是否写入缓存)
+
+        429/5xx 按 Retry-After(缺省为指数退避)推迟该主机后重试，代理错误换下一个代理重试；
+        重试用尽的结果不写入缓存，避免把暂时性错误当作失效链接缓存。
+        """
+        import requests
+
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries):
+            try:
+                return self._fetch(url, host), True
+            except _RetryLater as e:
+                delay = e.retry_after if e.retry_after is not None else 2 ** attempt + random.uniform(0, 1)
+                if delay > self.max_retry_after:
+                    logger.debug(f"解析链接需等待 {delay:.0f} 秒，留到下一轮: {url}")
+                    break
+                logger.debug(f"解析链接受限 ({e.status})，{delay:.1f} 秒后重试: {url}")
+                self.throttle.defer(host, delay)
+            except requests.exceptions.ProxyError as e:
+                logger.debug(f"解析链接代理错误，换用下一个代理: {url} ({e})")
+            except requests.exceptions.RequestException as e:
+                logger.debug(f"解析链接异常: {url} ({e})")
+                return None, True
+        return None, False
+
+    def resolve(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        解析一批链接
+
+        Returns:
+            {原链接: 最终地址}，解析失败或留到下一轮的为 None；非跳转链接原样返回
+        """
+        unique = list(dict.fromkeys(u for u in urls if u))
+        results: Dict[str, Optional[str]] = {
+            u: u for u in unique if not self.is_redirect_link(u)
+        }
+        pending = [u for u in unique if self.is_redirect_link(u)]
+
+        cached = self.cache.get_many(pending)
+        results.update(cached)
+        misses = [u for u in pending if u not in cached]
+        self.stats["hits"] += len(cached)
+        self.stats["misses"] += len(misses)
+
+        if misses:
+            logger.info(f"解析跳转链接: 缓存命中 {len(cached)}，需要请求 {len(misses)}")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                resolved = list(executor.map(self._resolve_one, misses))
+            entries = []
+            for url, (canonical, cacheable) in zip(misses, resolved):
+                results[url] = canonical
+                if not cacheable:
+                    self.stats["deferred"] += 1
+                elif canonical:
+                    self.stats["resolved"] += 1
+                    entries.append((url, canonical, self.ttl))
+                else:
+                    self.stats["failed"] += 1
+                    entries.append((url, None, self.negative_ttl))
+            self.cache.put_many(entries)
+            if len(entries) < len(misses):
+                logger.warning(f"跳转链接被限流或服务暂时不可用，{len(misses) - len(entries)} 个留到下一轮解析")
+
+        return results
+
+    def resolve_items(self, items: List) -> List:
+        """为 HotItem 填充 canonical_url 字段"""
+        mapping = self.resolve(item.url for item in items)
+        for item in items:
+            item.canonical_url = mapping.get(item.url)
+        return items
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def close(self):
+        self.session.close()
+        self.cache.close()
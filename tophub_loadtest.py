@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+今日热榜压测工具 - Load Test Harness
+
+在本地模拟 TopHub 服务器，驱动完整的服务流水线
+(调度器 -> 请求 -> 解析 -> 跳转链接解析 -> 输出管道)，测量:
+- 每轮爬取耗时、超时轮次(耗时超过调度间隔)、错过的轮次、调度器延迟
+- 进程 CPU 与 RSS 随时间变化
+- 输出管道延迟与队列深度
+- 跳转链接解析耗时与缓存命中率
+
+用法:
+    python tophub_loadtest.py --categories 50 --nodes 20 --interval 300 --duration 1800
+    python tophub_loadtest.py --sweep 5,10,25,50 --interval 60 --duration 300
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ============ 模拟服务器 ============
+
+class MockTopHubServer:
+    """模拟 tophub.today 的分类页 (/c/<n>)、节点页 (/n/<n>) 与跳转链接 (/l/<id>)"""
+
+    def __init__(
+        self,
+        platforms_per_page: int = 20,               # 每页平台榜单数
+        items_per_platform: int = 50,               # 每个榜单条目数
+        latency: Tuple[float, float] = (0.05, 0.3),  # 响应延迟范围(秒)
+        rate_limit: Optional[float] = None,         # 每秒允许的请求数，超过返回 429
+        error_rate: float = 0.0,                    # 随机 429 概率
+        churn: float = 0.1,                         # 每次请求变化的条目比例
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        self.platforms_per_page = platforms_per_page
+        self.items_per_platform = items_per_platform
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.churn = churn
+        self.stats = {"requests": 0, "rate_limited": 0, "redirects": 0}
+        self._lock = threading.Lock()
+        self._window: List[float] = []
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def redirect_prefix(self) -> str:
+        """页面中跳转链接的前缀，供 LinkResolver 识别"""
+        return f"{self.base_url}/l/"
+
+    def category_urls(self, count: int) -> List[str]:
+        return [f"{self.base_url}/c/{i}" for i in range(count)]
+
+    def node_urls(self, count: int) -> List[str]:
+        return [f"{self.base_url}/n/{i}" for i in range(count)]
+
+    def _rate_limited(self) -> bool:
+        """滑动窗口限流 + 随机 429"""
+        now = time.time()
+        with self._lock:
+            self.stats["requests"] += 1
+            self._window = [t for t in self._window if t > now - 1]
+            self._window.append(now)
+            limited = (
+                (self.rate_limit is not None and len(self._window) > self.rate_limit)
+                or random.random() < self.error_rate
+            )
+            if limited:
+                self.stats["rate_limited"] += 1
+        return limited
+
+    def render(self, page: str) -> str:
+        """生成与 tophub.today 结构一致的页面"""
+        rng = random.Random(page)
+        parts = ['<html><head><meta charset="utf-8"></head><body><div class="bc">']
+        platforms = self.platforms_per_page if page.startswith("c") else 1
+        for p in range(platforms):
+            parts.append(
+                f'<div class="cc-cd" id="node-{page}-{p}"><div class="cc-cd-ih"><div class="cc-cd-is">'
+                f'<a href="/n/{p}"><div class="cc-cd-lb"><span>平台{page}-{p}</span></div></a>'
+                f'</div></div><div class="cc-cd-cb nano"><div class="cc-cd-cb-l nano-content">'
+            )
+            for i in range(1, self.items_per_platform + 1):
+                # 一部分条目每次请求都变化，模拟榜单更新
+                suffix = random.randint(0, 10 ** 6) if rng.random() < self.churn else i
+                parts.append(
+                    f'<a href="{self.redirect_prefix}{page}-{p}-{suffix}" target="_blank">'
+                    f'<div class="cc-cd-cb-ll"><span class="s">{i}</span>'
+                    f'<span class="t">模拟热点标题 {page} {p} {suffix} 台风 股市 新品发布</span>'
+                    f'<span class="e">{rng.randint(1, 999)}万</span></div></a>'
+                )
+            parts.append('</div></div></div>')
+        parts.append('</div></body></html>')
+        return "".join(parts)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _limited(self) -> bool:
+                time.sleep(random.uniform(*server.latency))
+                if not server._rate_limited():
+                    return False
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return True
+
+            def _redirect(self) -> bool:
+                """跳转链接返回 302，目标为外部站点(LinkResolver 只读取 Location，不会访问)"""
+                if not self.path.startswith("/l/"):
+                    return False
+                with server._lock:
+                    server.stats["redirects"] += 1
+                self.send_response(302)
+                self.send_header("Location", f"https://example.com/article/{self.path[3:]}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return True
+
+            def do_HEAD(self):
+                if self._limited() or self._redirect():
+                    return
+                self.send_response(405)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                if self._limited() or self._redirect():
+                    return
+                page = self.path.strip("/").replace("/", "")
+                body = server.render(page).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        logger.info(f"模拟服务器已启动: {self.base_url}")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ============ 资源采样 ============
+
+def _rss_bytes() -> int:
+    """当前进程常驻内存"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # 不支持读取当前值时退回峰值 (Linux 单位 KB，macOS 单位字节)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+
+class ResourceSampler:
+    """定时采样 CPU、RSS 与输出队列深度"""
+
+    def __init__(self, interval: float = 1.0, pipeline=None):
+        self.interval = interval
+        self.pipeline = pipeline
+        self.samples: List[Dict] = []
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        start = time.time()
+        last_cpu = time.process_time()
+        last_t = start
+        while not self._stopping.wait(self.interval):
+            now, cpu = time.time(), time.process_time()
+            self.samples.append({
+                "t": round(now - start, 1),
+                "cpu_percent": round((cpu - last_cpu) / (now - last_t) * 100, 1),
+                "rss_mb": round(_rss_bytes() / 1024 / 1024, 1),
+                "queue_depth": self.pipeline.queue.qsize() if self.pipeline else 0
+            })
+            last_cpu, last_t = cpu, now
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+
+# ============ 压测 ============
+
+@dataclass
+class LoadTestReport:
+    """压测结果"""
+    categories: int
+    nodes: int
+    interval: float
+    duration: float
+    cycles: List[Dict] = field(default_factory=list)
+    missed: int = 0                 # 已到计划时间超过一个检查间隔仍未开始的轮次
+    samples: List[Dict] = field(default_factory=list)
+    pipeline: Dict = field(default_factory=dict)
+    server: Dict = field(default_factory=dict)
+    links: Dict = field(default_factory=dict)
+
+    def summary(self) -> Dict:
+        durations = sorted(c["duration"] for c in self.cycles) or [0.0]
+        lags = [c["lag"] for c in self.cycles] or [0.0]
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        mean = sum(durations) / len(durations)
+        overrun = sum(1 for c in self.cycles if c["duration"] > self.interval)
+        utilization = mean / self.interval
+        return {
+            "pages_per_cycle": self.categories + self.nodes,
+            "interval_s": self.interval,
+            # 调度器在上一轮结束后才安排下一轮，按计划时间而非固定节拍统计
+            "cycles_expected": len(self.cycles) + self.missed,
+            "cycles_completed": len(self.cycles),
+            "cycles_missed": self.missed,
+            "cycles_overrun": overrun,
+            "cycle_mean_s": round(mean, 2),
+            "cycle_p95_s": round(p95, 2),
+            "cycle_max_s": round(durations[-1], 2),
+            "schedule_lag_max_s": round(max(lags), 2),
+            # 相对固定节拍 start + n * interval 的累计漂移，约为此前各轮耗时之和
+            "schedule_drift_s": round(self.cycles[-1]["drift"], 2) if self.cycles else 0.0,
+            "utilization": round(utilization, 2),
+            # 一轮爬取跑不完一个调度间隔，或调度器未能按时启动任务，流水线即已饱和
+            "saturated": utilization >= 1 or overrun > 0 or self.missed > 0,
+            "items_per_cycle": self.cycles[-1]["items"] if self.cycles else 0,
+            "cpu_percent_max": max((s["cpu_percent"] for s in self.samples), default=0),
+            "rss_mb_max": max((s["rss_mb"] for s in self.samples), default=0),
+            "queue_depth_max": max((s["queue_depth"] for s in self.samples), default=0),
+            "sink_lag_max_s": round(self.pipeline.get("max_lag", 0), 2),
+            "links_max_s": round(max((c.get("links", 0.0) for c in self.cycles), default=0.0), 2),
+            "link_hit_rate": round(self.links.get("hit_rate", 0.0), 2),
+            "links_deferred": self.links.get("deferred", 0),
+            "server_requests": self.server.get("requests", 0),
+            "server_429": self.server.get("rate_limited", 0),
+            "server_redirects": self.server.get("redirects", 0)
+        }
+
+
+class LoadTest:
+    """对 TopHubService 完整流水线进行压测"""
+
+    def __init__(
+        self,
+        categories: int = 50,
+        nodes: int = 0,
+        interval: float = 300,                      # 调度间隔(秒)
+        duration: float = 1800,                     # 压测时长(秒)
+        delay_range: Tuple[float, float] = (0, 0),  # 爬虫请求间隔
+        sample_interval: float = 1.0,
+        server: Optional[MockTopHubServer] = None
+    ):
+        self.categories = categories
+        self.nodes = nodes
+        self.interval = interval
+        self.duration = duration
+        self.delay_range = delay_range
+        self.sample_interval = sample_interval
+        self.server = server or MockTopHubServer()
+
+    def run(self) -> LoadTestReport:
+        from tophub_scraper import TopHubScraper
+        from tophub_service import TopHubService
+
+        self.server.start()
+        output_dir = tempfile.mkdtemp(prefix="tophub_loadtest_")
+        urls = self.server.category_urls(self.categories) + self.server.node_urls(self.nodes)
+        scraper = TopHubScraper(delay_range=self.delay_range, max_retries=3, timeout=30)
+        service = TopHubService(urls=urls, scraper=scraper, output_dir=output_dir)
+        # 模拟页面的条目链接指向模拟服务器的 /l/，与线上 tophub.today/l/ 一样逐个解析
+        service.link_resolver.redirect_prefix = self.server.redirect_prefix
+        service.poll_seconds = min(1.0, self.interval / 10)
+
+        report = LoadTestReport(self.categories, self.nodes, self.interval, self.duration)
+        start = time.time()
+        crawl_job = service.crawl_job
+
+        def timed_crawl_job():
+            # 首轮在启动时立即执行；之后的计划时间为调度任务的 next_run
+            # (schedule 在任务返回后才更新 next_run，执行期间仍为本轮的计划时间)
+            job = service._crawl_job
+            scheduled = job.next_run.timestamp() if job is not None else start
+            begin = time.time()
+            items = crawl_job()
+            scraped = time.time()
+            # 跳转链接在后台线程解析后提交，计入本轮耗时，否则冷缓存下的解析开销不会体现在饱和判定中
+            service.wait_for_links()
+            end = time.time()
+            report.cycles.append({
+                "started": round(begin - start, 2),
+                "lag": max(0.0, begin - scheduled),
+                "drift": max(0.0, begin - (start + len(report.cycles) * self.interval)),
+                "duration": end - begin,
+                "links": end - scraped,
+                "items": len(items or [])
+            })
+            logger.info(f"第 {len(report.cycles)} 轮完成，耗时 {end - begin:.2f} 秒")
+
+        service.crawl_job = timed_crawl_job
+        sampler = ResourceSampler(self.sample_interval, service.pipeline)
+        sampler.start()
+
+        thread = threading.Thread(
+            target=service.run_scheduler, args=(self.interval / 3600,), daemon=True
+        )
+        thread.start()
+        try:
+            time.sleep(self.duration)
+        finally:
+            stopped = time.time()
+            service.stop()
+            thread.join(timeout=self.interval + 60)
+            # 停止时仍在等待的下一轮不计入；已过计划时间一个检查间隔以上仍未开始的才算错过
+            job = service._crawl_job
+            if job is not None and job.next_run.timestamp() < stopped - service.poll_seconds:
+                report.missed += 1
+            sampler.stop()
+            self.server.stop()
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        report.samples = sampler.samples
+        report.pipeline = dict(service.pipeline.stats)
+        report.server = dict(self.server.stats)
+        report.links = dict(service.link_resolver.stats, hit_rate=service.link_resolver.hit_rate)
+        return report
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='今日热榜服务压测')
+    parser.add_argument('--categories', type=int, default=50, help='分类页数量')
+    parser.add_argument('--nodes', type=int, default=0, help='节点页数量')
+    parser.add_argument('--platforms', type=int, default=20, help='每个分类页的平台数')
+    parser.add_argument('--items', type=int, default=50, help='每个平台的条目数')
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.05, 0.3),
+                        metavar=('MIN', 'MAX'), help='模拟响应延迟范围（秒）')
+    parser.add_argument('--rate-limit', type=float, help='每秒请求上限，超过返回 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机 429 概率')
+    parser.add_argument('--delay', type=float, nargs=2, default=(0, 0),
+                        metavar=('MIN', 'MAX'), help='爬虫请求间隔（秒）')
+    parser.add_argument('--interval', type=float, default=300, help='调度间隔（秒）')
+    parser.add_argument('--duration', type=float, default=1800, help='压测时长（秒）')
+    parser.add_argument('--sweep', help='依次测试多个分类数量，如 5,10,25,50')
+    parser.add_argument('--json', action='store_true', help='输出完整 JSON 报告')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger.setLevel(logging.INFO)
+
+    counts = [int(c) for c in args.sweep.split(",")] if args.sweep else [args.categories]
+    results = []
+    for count in counts:
+        server = MockTopHubServer(
+            platforms_per_page=args.platforms,
+            items_per_platform=args.items,
+            latency=tuple(args.latency),
+            rate_limit=args.rate_limit,
+            error_rate=args.error_rate
+        )
+        report = LoadTest(
+            categories=count,
+            nodes=args.nodes,
+            interval=args.interval,
+            duration=args.duration,
+            delay_range=tuple(args.delay),
+            server=server
+        ).run()
+        summary = report.summary()
+        results.append(summary)
+        if args.json:
+            print(json.dumps({
+                "summary": summary, "cycles": report.cycles, "samples": report.samples
+            }, ensure_ascii=False, indent=2))
+
+    if not args.json:
+        keys = list(results[0])
+        print("\n" + " | ".join(keys))
+        for summary in results:
+            print(" | ".join(str(summary[k]) for k in keys))
+        saturated = [s for s in results if s["saturated"]]
+        if saturated:
+            print(f"\n饱和点: {saturated[0]['pages_per_cycle']} 页/轮 "
+                  f"(利用率 {saturated[0]['utilization']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,24 +8,22 @@ https://tophub.today/c/news
 - 绕过反爬检测（真实浏览器环境）
 - 支持无头/有头模式
 - 自动等待页面加载完成
+- 多标签页并行爬取多个分类页面
 """
 
 import os
 import json
+import random
 import logging
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Optional
 from dataclasses import dataclass
 from pathlib import Path
+from urllib.parse import urlparse
 
 from playwright.async_api import async_playwright, Page, Browser
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +36,8 @@ class HotItem:
     url: str
     heat: Optional[str]
     timestamp: str
+    canonical_url: Optional[str] = None
+    category: Optional[str] = None      # 来源分类/节点，如 news、tech
     
     def to_dict(self) -> Dict:
         return {
@@ -46,21 +46,33 @@ class HotItem:
             "title": self.title,
             "url": self.url,
             "heat": self.heat,
-            "timestamp": self.timestamp
+            "timestamp": self.timestamp,
+            "canonical_url": self.canonical_url,
+            "category": self.category
         }
 
 
+def category_from_url(url: str) -> str:
+    """从页面地址提取分类名: https://tophub.today/c/news -> news"""
+    path = urlparse(url).path.rstrip("/")
+    return path.rsplit("/", 1)[-1] or url
+
+
 class TopHubEdgeScraper:
     """今日热榜 Edge 浏览器爬虫"""
     
     BASE_URL = "https://tophub.today/c/news"
+    DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.0.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.0 Edg/120.0.0.0"
     
     def __init__(
         self,
         headless: bool = True,
         window_size: tuple = (1920, 1080),
         timeout: int = 30000,
-        user_data_dir: Optional[str] = None
+        user_data_dir: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        max_tabs: int = 4,
+        tab_timeout: float = 90
     ):
         """
         初始化爬虫
@@ -70,13 +82,35 @@ class TopHubEdgeScraper:
             window_size: 浏览器窗口大小
             timeout: 页面加载超时（毫秒）
             user_data_dir: Edge 用户数据目录（保持登录状态）
+            user_agent: 浏览器上下文的 User-Agent
+            max_tabs: scrape_many 同时打开的最大标签页数
+            tab_timeout: scrape_many 单个标签页的总超时（秒，含加载、滚动和提取）
         """
         self.headless = headless
         self.window_size = window_size
         self.timeout = timeout
         self.user_data_dir = user_data_dir
+        self.user_agent = user_agent or self.DEFAULT_USER_AGENT
+        self.max_tabs = max_tabs
+        self.tab_timeout = tab_timeout
         self.browser: Optional[Browser] = None
         self.context = None
+    
+    @classmethod
+    def from_config(cls, config) -> "TopHubEdgeScraper":
+        """根据 TopHubConfig 创建爬虫，User-Agent 在创建浏览器上下文时选定"""
+        user_agent = None
+        if config.user_agents:
+            user_agent = random.choice(config.user_agents) if config.random_ua else config.user_agents[0]
+        return cls(
+            headless=config.headless,
+            window_size=tuple(config.window_size),
+            timeout=config.page_timeout,
+            user_data_dir=config.resolve_user_data_dir(),
+            user_agent=user_agent,
+            max_tabs=config.max_tabs,
+            tab_timeout=config.tab_timeout
+        )
         
     async def __aenter__(self):
         """异步上下文管理器入口"""
@@ -116,16 +150,20 @@ class TopHubEdgeScraper:
         if executable_path:
             browser_kwargs["executable_path"] = executable_path
         
-        if self.user_data_dir:
-            browser_kwargs["user_data_dir"] = self.user_data_dir
-            
-        self.browser = await self.playwright.chromium.launch(**browser_kwargs)
+        context_kwargs = {
+            "viewport": {"width": self.window_size[0], "height": self.window_size[1]},
+            "user_agent": self.user_agent
+        }
         
-        # 创建新上下文
-        self.context = await self.browser.new_context(
-            viewport={"width": self.window_size[0], "height": self.window_size[1]},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.0.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.0 Edg/120.0.0.0"
-        )
+        if self.user_data_dir:
+            # 持久化上下文保留登录状态和 Cookie，scrape_many 的各标签页共享
+            self.context = await self.playwright.chromium.launch_persistent_context(
+                self.user_data_dir, **browser_kwargs, **context_kwargs
+            )
+        else:
+            self.browser = await self.playwright.chromium.launch(**browser_kwargs)
+            # 创建新上下文
+            self.context = await self.browser.new_context(**context_kwargs)
         
         # 注入脚本绕过 webdriver 检测
         await self.context.add_init_script("""
@@ -143,6 +181,9 @@ class TopHubEdgeScraper:
         """异步上下文管理器出口"""
         if self.browser:
             await self.browser.close()
+        elif self.context:
+            # 持久化上下文没有单独的 Browser 对象
+            await self.context.close()
         if hasattr(self, 'playwright'):
             await self.playwright.stop()
     
@@ -171,14 +212,18 @@ class TopHubEdgeScraper:
     
     async def scrape(self) -> List[HotItem]:
         """执行爬取任务"""
-        logger.info(f"开始爬取: {self.BASE_URL}")
+        return await self._scrape_url(self.BASE_URL)
+    
+    async def _scrape_url(self, url: str) -> List[HotItem]:
+        """在新标签页中加载并提取一个页面"""
+        logger.info(f"开始爬取: {url}")
         
         page = await self.context.new_page()
         
         try:
             # 访问页面
             logger.info("正在加载页面...")
-            await page.goto(self.BASE_URL, wait_until="networkidle", timeout=self.timeout)
+            await page.goto(url, wait_until="networkidle", timeout=self.timeout)
             
             # 等待内容加载
             await page.wait_for_selector('div[class^="cc-cd"]', timeout=self.timeout)
@@ -187,15 +232,60 @@ class TopHubEdgeScraper:
             await self._scroll_to_load(page)
             
             # 提取数据
-            items = await self._extract_data(page)
+            items = await self._extract_data(page, category_from_url(url))
             
-            logger.info(f"成功获取 {len(items)} 条数据")
+            logger.info(f"成功获取 {len(items)} 条数据: {url}")
             return items
             
         finally:
             await page.close()
     
-    async def _extract_data(self, page: Page) -> List[HotItem]:
+    async def scrape_many(
+        self,
+        urls: Iterable[str],
+        max_tabs: Optional[int] = None,
+        tab_timeout: Optional[float] = None
+    ) -> List[HotItem]:
+        """
+        在同一浏览器上下文中用多个标签页并行爬取多个页面
+        
+        各标签页共享上下文的 Cookie；单个页面失败或超时只跳过该页面。
+        结果按 urls 顺序合并，每条数据的 category 标记其来源分类。
+        
+        Args:
+            urls: 分类/节点页面地址
+            max_tabs: 同时打开的最大标签页数，默认使用初始化参数
+            tab_timeout: 单个标签页的总超时（秒），默认使用初始化参数
+        """
+        urls = list(dict.fromkeys(urls))
+        max_tabs = max_tabs or self.max_tabs
+        tab_timeout = tab_timeout or self.tab_timeout
+        semaphore = asyncio.Semaphore(max_tabs)
+        logger.info(f"并行爬取 {len(urls)} 个页面，最多 {max_tabs} 个标签页")
+        
+        async def scrape_tab(url: str) -> List[HotItem]:
+            async with semaphore:
+                return await asyncio.wait_for(self._scrape_url(url), timeout=tab_timeout)
+        
+        results = await asyncio.gather(*(scrape_tab(url) for url in urls), return_exceptions=True)
+        
+        items: List[HotItem] = []
+        failed = 0
+        for url, result in zip(urls, results):
+            if isinstance(result, asyncio.TimeoutError):
+                failed += 1
+                logger.error(f"页面超时 ({tab_timeout} 秒): {url}")
+            elif isinstance(result, BaseException):
+                # 包括 CancelledError(BaseException 子类)，同样只跳过该页面
+                failed += 1
+                logger.error(f"爬取页面出错: {url} ({result!r})")
+            else:
+                items.extend(result)
+        
+        logger.info(f"并行爬取完成，成功 {len(urls) - failed}/{len(urls)} 个页面，共 {len(items)} 条数据")
+        return items
+    
+    async def _extract_data(self, page: Page, category: Optional[str] = None) -> List[HotItem]:
         """从页面提取数据"""
         items = []
         timestamp = datetime.now().isoformat()
@@ -242,7 +332,8 @@ class TopHubEdgeScraper:
                             title=title,
                             url=href,
                             heat=heat,
-                            timestamp=timestamp
+                            timestamp=timestamp,
+                            category=category
                         )
                         items.append(item)
                         
@@ -299,15 +390,23 @@ async def main():
                         help='输出目录')
     parser.add_argument('--wait', '-w', type=int, default=30000,
                         help='页面加载超时（毫秒，默认30000）')
+    parser.add_argument('--url', action='append',
+                        help='爬取的分类页面(可多次指定，多个页面时并行打开标签页)')
+    parser.add_argument('--tabs', type=int, default=4,
+                        help='同时打开的最大标签页数（默认4）')
     
     args = parser.parse_args()
     headless = not args.no_headless
     
     async with TopHubEdgeScraper(
         headless=headless,
-        timeout=args.wait
+        timeout=args.wait,
+        max_tabs=args.tabs
     ) as scraper:
-        items = await scraper.scrape()
+        if args.url:
+            items = await scraper.scrape_many(args.url)
+        else:
+            items = await scraper.scrape()
         
         if items:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -334,4 +433,8 @@ async def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
     asyncio.run(main())
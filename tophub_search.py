@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+今日热榜标题全文检索 - Title Search Index
+
+基于 SQLite FTS5 的历史标题索引。中文按二元组 (bigram) 切分，
+英文/数字按单词切分，支持按平台、时间范围过滤，按热度、排名或时间排序。
+
+存储结构:
+- titles:     去重后的 (平台, 标题, 链接)
+- titles_fts: 标题分词后的全文索引 (rowid 对应 titles.id)
+- hits:       每次快照中出现的排名与热度
+
+用法:
+    python tophub_search.py index ~/Desktop          # 导入历史快照与归档
+    python tophub_search.py query 台风 --platform 微博 --since 2026-10-01
+"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from tophub_scraper import parse_heat_value
+from tophub_writer import Sink, Snapshot, FsyncBatch
+
+logger = logging.getLogger(__name__)
+
+
+# 中日韩统一表意文字及常用扩展
+_CJK = r'㐀-䶿一-鿿豈-﫿'
+_TOKEN_PATTERN = re.compile(rf'[{_CJK}]+|[0-9a-zA-ZÀ-ɏ]+')
+_CJK_RUN = re.compile(rf'^[{_CJK}]+$')
+
+SORT_ORDERS = {
+    "heat": "max_heat IS NULL, max_heat DESC",
+    "rank": "best_ranking IS NULL, best_ranking ASC, max_heat DESC",
+    "recent": "last_seen DESC"
+}
+
+
+def tokenize(text: str) -> List[List[str]]:
+    """
+    切分文本为词组，每组是需要连续匹配的 token 序列
+
+    中文连续片段切为二元组: "台风登陆" -> ["台风", "风登", "登陆"]，
+    单字片段保留为单字；英文数字按单词切分并转小写。
+    """
+    groups = []
+    for run in _TOKEN_PATTERN.findall(text or ""):
+        if _CJK_RUN.match(run):
+            if len(run) == 1:
+                groups.append([run])
+            else:
+                groups.append([run[i:i + 2] for i in range(len(run) - 1)])
+        else:
+            groups.append([run.lower()])
+    return groups
+
+
+def _index_columns(title: str):
+    """生成 (二元组列, 单字列) 的索引文本"""
+    bigrams = " ".join(token for group in tokenize(title) for token in group)
+    unigrams = " ".join(
+        ch for run in _TOKEN_PATTERN.findall(title) if _CJK_RUN.match(run) for ch in run
+    )
+    return bigrams, unigrams
+
+
+def _match_expression(query: str) -> Optional[str]:
+    """将用户查询转换为 FTS5 MATCH 表达式，各词组之间为 AND"""
+    clauses = []
+    for group in tokenize(query):
+        # 单个汉字在单字列中查找，其余词组作为短语(相邻二元组)查找
+        single_char = len(group) == 1 and len(group[0]) == 1 and _CJK_RUN.match(group[0])
+        column = "unigrams" if single_char else "bigrams"
+        clauses.append(f'{column} : "{" ".join(group)}"')
+    return " AND ".join(clauses) or None
+
+
+def _to_epoch(value) -> Optional[int]:
+    """
+    ISO 时间字符串/日期/datetime 转为秒级时间戳，空值返回 None
+
+    Raises:
+        ValueError: 无法解析的时间
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    try:
+        return int(datetime.fromisoformat(str(value)).timestamp())
+    except ValueError:
+        raise ValueError(f"无法解析的时间: {value!r}，应为 ISO 格式，如 2026-10-01 或 2026-10-01T08:00") from None
+
+
+@dataclass
+class SearchResult:
+    """检索结果 (按标题聚合)"""
+    platform: str
+    title: str
+    url: str
+    best_ranking: Optional[int]
+    max_heat: Optional[int]
+    first_seen: str
+    last_seen: str
+    appearances: int
+
+    def to_dict(self) -> Dict:
+        return {
+            "platform": self.platform,
+            "title": self.title,
+            "url": self.url,
+            "best_ranking": self.best_ranking,
+            "max_heat": self.max_heat,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "appearances": self.appearances
+        }
+
+
+class SearchIndex:
+    """标题全文索引"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS titles (
+                id INTEGER PRIMARY KEY,
+                platform TEXT NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT NOT NULL DEFAULT '',
+                UNIQUE (platform, title, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_titles_platform ON titles(platform);
+            CREATE VIRTUAL TABLE IF NOT EXISTS titles_fts USING fts5(
+                bigrams, unigrams, content='', tokenize='unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS hits (
+                title_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                ranking INTEGER,
+                heat INTEGER,
+                PRIMARY KEY (title_id, ts)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_hits_ts ON hits(ts);
+            CREATE TABLE IF NOT EXISTS sources (
+                name TEXT PRIMARY KEY
+            );
+        """)
+        self.conn.commit()
+
+    # ---------- 写入 ----------
+
+    def add_items(self, items: Iterable, snapshot: Optional[str] = None) -> int:
+        """
+        索引一批条目 (HotItem 或同结构的字典)，返回写入的条目数
+
+        Args:
+            snapshot: 快照时间戳 (YYYYmmdd_HHMMSS)。指定时所有条目使用该时间，
+                      与快照文件名、压缩归档中的时间一致，重复导入不会产生重复记录
+        """
+        count = 0
+        snapshot_ts = (
+            int(datetime.strptime(snapshot, "%Y%m%d_%H%M%S").timestamp()) if snapshot else None
+        )
+        with self._lock, self.conn:
+            for item in items:
+                data = item if isinstance(item, dict) else item.to_dict()
+                title = data.get("title")
+                if not title:
+                    continue
+                try:
+                    ts = snapshot_ts or _to_epoch(data.get("timestamp"))
+                except ValueError:
+                    ts = None
+                if ts is None:
+                    continue
+                key = (data.get("platform") or "", title, data.get("url") or "")
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO titles (platform, title, url) VALUES (?, ?, ?)", key
+                )
+                if cursor.rowcount:
+                    title_id = cursor.lastrowid
+                    self.conn.execute(
+                        "INSERT INTO titles_fts (rowid, bigrams, unigrams) VALUES (?, ?, ?)",
+                        (title_id, *_index_columns(title))
+                    )
+                else:
+                    title_id = self.conn.execute(
+                        "SELECT id FROM titles WHERE platform = ? AND title = ? AND url = ?", key
+                    ).fetchone()[0]
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO hits (title_id, ts, ranking, heat) VALUES (?, ?, ?, ?)",
+                    (title_id, ts, data.get("ranking"), parse_heat_value(data.get("heat")))
+                )
+                count += 1
+        return count
+
+    def index_directory(self, directory: str) -> int:
+        """
+        导入目录下的历史快照 (tophub_*.json) 与压缩归档 (tophub_archive/*.ndjson.gz)
+
+        已导入的文件会被记录，重复执行只处理新文件。
+        """
+        from tophub_compact import RAW_PATTERN, ARCHIVE_PATTERN, iter_archive_items
+
+        sources = []
+        for root in (directory, os.path.join(directory, "tophub_archive")):
+            if not os.path.isdir(root):
+                continue
+            for name in sorted(os.listdir(root)):
+                raw = RAW_PATTERN.match(name)
+                if raw and raw.group(3) == "json":
+                    sources.append((os.path.join(root, name), f"{raw.group(1)}_{raw.group(2)}"))
+                elif ARCHIVE_PATTERN.match(name):
+                    sources.append((os.path.join(root, name), None))
+
+        with self._lock:
+            done = {row[0] for row in self.conn.execute("SELECT name FROM sources")}
+
+        total = 0
+        for path, snapshot in sources:
+            name = os.path.basename(path)
+            if name in done:
+                continue
+            try:
+                if name.endswith(".ndjson.gz"):
+                    total += self.add_items(iter_archive_items(path))
+                else:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        total += self.add_items(json.load(f), snapshot)
+            except (OSError, ValueError) as e:
+                logger.warning(f"导入失败，跳过: {path} ({e})")
+                continue
+            with self._lock, self.conn:
+                self.conn.execute("INSERT OR IGNORE INTO sources (name) VALUES (?)", (name,))
+        logger.info(f"导入完成，共索引 {total} 条数据")
+        return total
+
+    # ---------- 查询 ----------
+
+    def _where(self, query, platforms, since, until):
+        match = _match_expression(query)
+        if match is None:
+            raise ValueError(f"查询中没有可检索的词: {query!r}")
+        clauses = ["titles_fts MATCH ?"]
+        params: List = [match]
+        if platforms:
+            clauses.append(f"t.platform IN ({','.join('?' * len(platforms))})")
+            params.extend(platforms)
+        since, until = _to_epoch(since), _to_epoch(until)
+        if since is not None:
+            clauses.append("h.ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("h.ts < ?")
+            params.append(until)
+        return " AND ".join(clauses), params
+
+    def search(
+        self,
+        query: str,
+        platforms: Optional[List[str]] = None,
+        since=None,                 # 起始时间(含)，ISO 字符串或 datetime
+        until=None,                 # 结束时间(不含)
+        sort: str = "heat",         # heat / rank / recent
+        limit: int = 50
+    ) -> List[SearchResult]:
+        """检索标题，按 (平台, 标题, 链接) 聚合时间范围内的出现记录"""
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"不支持的排序方式: {sort}，可选 {list(SORT_ORDERS)}")
+        where, params = self._where(query, platforms, since, until)
+        sql = f"""
+            SELECT t.platform, t.title, t.url,
+                   MIN(h.ranking) AS best_ranking, MAX(h.heat) AS max_heat,
+                   MIN(h.ts) AS first_seen, MAX(h.ts) AS last_seen, COUNT(*)
+            FROM titles_fts
+            JOIN titles t ON t.id = titles_fts.rowid
+            JOIN hits h ON h.title_id = t.id
+            WHERE {where}
+            GROUP BY t.id
+            ORDER BY {SORT_ORDERS[sort]}
+            LIMIT ?
+        """
+        with self._lock:
+            rows = self.conn.execute(sql, params + [limit]).fetchall()
+        return [
+            SearchResult(
+                platform=row[0], title=row[1], url=row[2],
+                best_ranking=row[3], max_heat=row[4],
+                first_seen=datetime.fromtimestamp(row[5]).isoformat(),
+                last_seen=datetime.fromtimestamp(row[6]).isoformat(),
+                appearances=row[7]
+            )
+            for row in rows
+        ]
+
+    def platform_counts(self, query: str, since=None, until=None) -> Dict[str, int]:
+        """哪些平台报道过包含关键词的内容: {平台: 不同标题数}"""
+        where, params = self._where(query, None, since, until)
+        sql = f"""
+            SELECT t.platform, COUNT(DISTINCT t.id)
+            FROM titles_fts
+            JOIN titles t ON t.id = titles_fts.rowid
+            JOIN hits h ON h.title_id = t.id
+            WHERE {where}
+            GROUP BY t.platform
+            ORDER BY 2 DESC
+        """
+        with self._lock:
+            return dict(self.conn.execute(sql, params).fetchall())
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class SearchSink(Sink):
+    """输出管道中的索引输出端，爬取结果写入时同步建立索引"""
+
+    name = "search"
+
+    def __init__(self, db_path: str):
+        self.index = SearchIndex(db_path)
+
+    def write(self, snapshot: Snapshot, batch: FsyncBatch):
+        count = self.index.add_items(snapshot.items, snapshot.timestamp)
+        logger.info(f"已索引 {count} 条标题")
+
+    def close(self):
+        self.index.close()
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    default_db = os.path.join(
+        os.path.expanduser("~"), "Desktop", "tophub_archive", "tophub_search.db"
+    )
+    parser = argparse.ArgumentParser(description='今日热榜标题检索')
+    parser.add_argument('--db', default=default_db, help='索引数据库路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help='导入历史快照和归档')
+    index_parser.add_argument('directory', help='快照目录')
+
+    query_parser = subparsers.add_parser('query', help='检索标题')
+    query_parser.add_argument('keywords', help='关键词')
+    query_parser.add_argument('--platform', '-p', action='append', help='平台过滤(可多次指定)')
+    query_parser.add_argument('--since', help='起始时间，如 2026-10-01')
+    query_parser.add_argument('--until', help='结束时间(不含)')
+    query_parser.add_argument('--sort', choices=list(SORT_ORDERS), default='heat', help='排序方式')
+    query_parser.add_argument('--limit', type=int, default=20, help='返回条数')
+    query_parser.add_argument('--platforms-only', action='store_true', help='只统计各平台数量')
+    query_parser.add_argument('--json', action='store_true', help='输出 JSON')
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    index = SearchIndex(args.db)
+
+    if args.command == 'index':
+        index.index_directory(args.directory)
+        return
+
+    try:
+        if args.platforms_only:
+            counts = index.platform_counts(args.keywords, args.since, args.until)
+        else:
+            results = index.search(
+                args.keywords, args.platform, args.since, args.until, args.sort, args.limit
+            )
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.platforms_only:
+        if args.json:
+            print(json.dumps(counts, ensure_ascii=False, indent=2))
+        else:
+            for platform, count in counts.items():
+                print(f"{platform}: {count}")
+        return
+
+    if args.json:
+        print(json.dumps([r.to_dict() for r in results], ensure_ascii=False, indent=2))
+        return
+    for r in results:
+        heat_str = f" (热度: {r.max_heat})" if r.max_heat else ""
+        print(f"[{r.platform}] #{r.best_ranking} {r.title[:50]}{heat_str}  {r.first_seen[:16]} ~ {r.last_seen[:16]}")
+    print(f"\n共 {len(results)} 条结果")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,87 +8,317 @@ import os
 import sys
 import time
 import logging
+import threading
 import schedule
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import List, Optional
 
 # 添加项目路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from tophub_scraper import TopHubScraper
+from tophub_feed import ChangeFeed, FeedServer, WebhookDispatcher
+from tophub_writer import OutputPipeline, JsonSink, CsvSink
+from tophub_compact import Compactor
+from tophub_search import SearchSink
+from tophub_links import LinkResolver
+from tophub_config import ConfigWatcher, TopHubConfig, find_config, load_config
 
-# 配置日志
+# 日志目录
 log_dir = os.path.join(os.path.expanduser("~"), "Desktop", "TopHubLogs")
-os.makedirs(log_dir, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(log_dir, "tophub_service.log"), encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+def setup_logging(directory: Optional[str] = None):
+    """配置服务日志(文件 + 控制台)，在服务入口调用而不是导入时执行"""
+    directory = directory or log_dir
+    os.makedirs(directory, exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(os.path.join(directory, "tophub_service.log"), encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
+
+
 class TopHubService:
     """爬虫服务类"""
     
-    def __init__(self):
-        self.scraper = TopHubScraper(
-            delay_range=(2, 3),
-            max_retries=3,
-            timeout=30
-        )
-        self.desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
+    def __init__(
+        self,
+        feed_port: Optional[int] = None,        # SSE 变更推送端口(None 不启动)
+        webhooks: Optional[List[str]] = None,   # 变更推送 Webhook 地址
+        urls: Optional[List[str]] = None,       # 爬取的分类/节点页面(默认 BASE_URL)
+        scraper: Optional[TopHubScraper] = None,
+        output_dir: Optional[str] = None,       # 输出目录(默认桌面)
+        config_path: Optional[str] = None       # 配置文件(修改后自动重新加载)
+    ):
+        # 显式传入的参数优先于配置文件，重新加载配置时也保持不变
+        self.config_path = config_path
+        self.explicit = {"urls"} if urls is not None else set()
+        self.config = load_config(config_path) if config_path else TopHubConfig()
+        self.scraper = scraper or TopHubScraper.from_config(self.config)
+        self.urls = urls if urls is not None else self._config_urls(self.config)
+        self.desktop_path = output_dir or self.config.resolve_output_dir()
+        self.log_dir = self.config.resolve_log_dir()
         self.running = True
+        self.scheduler = schedule.Scheduler()
+        self.poll_seconds = 60  # 调度器检查间隔(秒)
+        self._job_lock = threading.Lock()  # 停止时等待进行中的爬取任务提交完毕
+        self._wakeup = threading.Event()   # 配置变化或停止时唤醒调度循环
+        self._crawl_job = None
+        self._compact_job = None
+        self.interval_hours = self.config.schedule_interval
+        self.last_crawl_at: Optional[datetime] = None
+        
+        # 配置热加载：请求参数立即生效，调度和并发数在两次任务之间生效
+        self._config_lock = threading.Lock()
+        self._pending_config: Optional[TopHubConfig] = None
+        self._pending_changes = set()
+        self.config_watcher: Optional[ConfigWatcher] = None
+        
+        # 后台输出管道：写文件不阻塞调度线程，同时建立标题检索索引
+        self.pipeline = OutputPipeline(
+            sinks=[
+                JsonSink(self.desktop_path),
+                CsvSink(self.desktop_path),
+                SearchSink(os.path.join(self.desktop_path, "tophub_archive", "tophub_search.db"))
+            ],
+            dead_letter_dir=os.path.join(self.log_dir, "failed")
+        )
+        
+        # 跳转链接解析缓存，大部分链接跨轮次重复，只需解析一次
+        self.link_resolver = LinkResolver(
+            os.path.join(self.desktop_path, "tophub_archive", "tophub_links.db"),
+            max_workers=self.config.link_workers,
+            headers=dict(self.scraper.transport.headers),
+            proxy_pool=self.scraper.proxy_pool,
+            user_agents=self.scraper.user_agents,
+            random_ua=self.scraper.random_ua
+        )
+        self._link_workers = self.config.link_workers
+        self._links_thread: Optional[threading.Thread] = None
+        
+        # 每日压缩历史快照，控制桌面文件数量
+        self.compactor = Compactor(self.desktop_path)
+        self.compactor.apply_config(self.config)
+        self._compact_thread: Optional[threading.Thread] = None
+        
+        # 变更推送：下游订阅事件，无需轮询桌面文件
+        self.feed = ChangeFeed()
+        self.feed_server: Optional[FeedServer] = None
+        self.webhooks: List[WebhookDispatcher] = []
+        if feed_port is None:
+            feed_port = self.config.feed_port
+        if webhooks is None:
+            webhooks = list(self.config.webhooks)
+        if feed_port is not None:
+            self.feed_server = FeedServer(self.feed, port=feed_port)
+            self.feed_server.start()
+        for url in webhooks or []:
+            dispatcher = WebhookDispatcher(self.feed, url)
+            dispatcher.start()
+            self.webhooks.append(dispatcher)
+        
+        if config_path:
+            self.config_watcher = ConfigWatcher(config_path, self.config, self._on_config_change)
+            self.config_watcher.start()
         
+    @staticmethod
+    def _config_urls(config: TopHubConfig) -> Optional[List[str]]:
+        return list(config.urls) if config.urls else None
+    
+    def _on_config_change(self, old: TopHubConfig, new: TopHubConfig, changed: set):
+        """配置监视线程回调"""
+        # 请求间隔、重试、超时、代理和 User-Agent 在下一次请求时生效，
+        # 进行中的爬取不会中断；跳转链接解析与爬虫共用代理池和 User-Agent
+        self.scraper.apply_config(new)
+        self.link_resolver.apply_config(new)
+        with self._config_lock:
+            self._pending_config = new
+            self._pending_changes |= changed
+        self._wakeup.set()
+    
+    def apply_pending_config(self):
+        """在调度线程中、两次任务之间应用爬取页面、调度、并发数和保留策略的变化"""
+        with self._config_lock:
+            config, changed = self._pending_config, self._pending_changes
+            self._pending_config, self._pending_changes = None, set()
+        if config is None:
+            return
+        
+        self.config = config
+        kept = changed & self.explicit
+        if kept:
+            logger.info(f"以下配置项由启动参数指定，忽略配置文件的修改: {', '.join(sorted(n.upper() for n in kept))}")
+            changed -= kept
+        if "urls" in changed:
+            self.urls = self._config_urls(config)
+            logger.info(f"爬取页面已更新: {len(self.urls or [TopHubScraper.BASE_URL])} 个")
+        if "link_workers" in changed:
+            # 解析进行中不替换连接池，由解析线程在下一轮解析前应用
+            self._link_workers = config.link_workers
+            if self.wait_for_links(0):
+                self.link_resolver.set_max_workers(config.link_workers)
+            logger.info(f"跳转链接并发数已更新: {config.link_workers}")
+        if "schedule_interval" in changed and self._crawl_job is not None:
+            self._schedule_crawl(config.schedule_interval)
+        if "compact_at" in changed and self._compact_job is not None:
+            self._schedule_compact(config.compact_at)
+        if changed & {"raw_days", "compacted_days", "top_n", "top_days"}:
+            self.compactor.apply_config(config)
+            logger.info(
+                f"保留策略已更新: 原始快照 {config.raw_days} 天，日归档 {config.compacted_days} 天，"
+                f"Top-{config.top_n} {'永久' if config.top_days is None else f'{config.top_days} 天'}"
+            )
+    
+    def _schedule_crawl(self, interval_hours: float):
+        """(重新)安排爬取任务，下次执行时间按上次爬取时间和新间隔计算"""
+        if self._crawl_job is not None:
+            self.scheduler.cancel_job(self._crawl_job)
+        self.interval_hours = interval_hours
+        seconds = max(1, round(interval_hours * 3600))
+        self._crawl_job = self.scheduler.every(seconds).seconds.do(self.crawl_job)
+        if self.last_crawl_at is not None:
+            self._crawl_job.next_run = max(
+                datetime.now(), self.last_crawl_at + timedelta(seconds=seconds)
+            )
+        logger.info(f"爬取间隔: {interval_hours} 小时，下次执行: {self._crawl_job.next_run:%H:%M:%S}")
+    
+    def _schedule_compact(self, at: str):
+        if self._compact_job is not None:
+            self.scheduler.cancel_job(self._compact_job)
+        self._compact_job = self.scheduler.every().day.at(at).do(self.compact_job)
+        logger.info(f"每日压缩时间: {at}")
+    
     def crawl_job(self):
-        """定时爬取任务"""
-        try:
-            logger.info("开始定时爬取任务...")
-            items = self.scraper.scrape()
+        """定时爬取任务，跳转链接在后台线程解析后提交，不占用调度线程"""
+        with self._job_lock:
+            self.last_crawl_at = datetime.now()
+            try:
+                logger.info("开始定时爬取任务...")
+                items = self.scraper.scrape(self.urls)
             
-            if items:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                
-                json_file = os.path.join(self.desktop_path, f"tophub_{timestamp}.json")
-                csv_file = os.path.join(self.desktop_path, f"tophub_{timestamp}.csv")
-                
-                self.scraper.save_to_json(items, json_file)
-                self.scraper.save_to_csv(items, csv_file)
-                
-                logger.info(f"定时任务完成，保存了 {len(items)} 条数据")
-            else:
-                logger.warning("定时任务未获取到数据")
+                if items:
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    # 上一轮的链接通常早已解析完；未完成时等待，保证快照和事件按爬取顺序提交
+                    if self._links_thread is not None and self._links_thread.is_alive():
+                        logger.warning("上一轮跳转链接仍在解析，等待其提交...")
+                        self._links_thread.join()
+                    self._links_thread = threading.Thread(
+                        target=self._resolve_and_submit, args=(items, timestamp),
+                        name="tophub-links", daemon=True
+                    )
+                    self._links_thread.start()
+                    logger.info(f"定时任务完成，获取了 {len(items)} 条数据，解析跳转链接后提交")
+                else:
+                    logger.warning("定时任务未获取到数据")
+                return items
                 
+            except Exception as e:
+                logger.error(f"定时任务出错: {e}", exc_info=True)
+                return []
+    
+    def _resolve_and_submit(self, items, timestamp: str):
+        """解析跳转链接(冷缓存时可能需要数分钟)，然后提交到输出管道和变更推送"""
+        try:
+            if self.link_resolver.max_workers != self._link_workers:
+                self.link_resolver.set_max_workers(self._link_workers)
+            self.link_resolver.resolve_items(items)
+            logger.info(f"跳转链接缓存命中率: {self.link_resolver.hit_rate:.1%}")
         except Exception as e:
-            logger.error(f"定时任务出错: {e}", exc_info=True)
+            logger.warning(f"解析跳转链接出错，保留原链接: {e}")
+        
+        self.pipeline.submit(items, timestamp)
+        self.feed.publish(items)
+        logger.info(f"提交了 {len(items)} 条数据")
+    
+    def wait_for_links(self, timeout: Optional[float] = None) -> bool:
+        """等待后台的跳转链接解析和提交完成，返回是否已完成"""
+        if self._links_thread is not None:
+            self._links_thread.join(timeout)
+            return not self._links_thread.is_alive()
+        return True
+    
+    def compact_job(self):
+        """每日快照压缩与保留清理，在后台线程执行，首次压缩大量积压快照时不阻塞爬取任务"""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            logger.warning("上一次压缩任务仍在运行，跳过本次")
+            return
+        self._compact_thread = threading.Thread(
+            target=self._run_compaction, name="tophub-compact", daemon=True
+        )
+        self._compact_thread.start()
+    
+    def _run_compaction(self):
+        try:
+            logger.info("开始压缩历史快照...")
+            self.compactor.run()
+        except Exception as e:
+            logger.error(f"压缩任务出错: {e}", exc_info=True)
     
     def run_once(self):
         """运行一次"""
         logger.info("执行单次爬取...")
         self.crawl_job()
+        self.wait_for_links()
+        self.pipeline.flush()
     
-    def run_scheduler(self, interval_hours=1):
-        """运行定时调度器"""
+    def run_scheduler(self, interval_hours: Optional[float] = None):
+        """
+        运行定时调度器，interval_hours 为 None 时使用配置的 SCHEDULE_INTERVAL；
+        显式指定时，之后修改配置文件的 SCHEDULE_INTERVAL 不再改变间隔
+        """
+        if interval_hours is None:
+            interval_hours = self.config.schedule_interval
+        else:
+            self.explicit.add("schedule_interval")
         logger.info(f"启动定时调度器，每 {interval_hours} 小时执行一次")
         
-        # 设置定时任务
-        schedule.every(interval_hours).hours.do(self.crawl_job)
-        
         # 立即执行一次
         self.crawl_job()
         
+        # 设置定时任务
+        self._schedule_crawl(interval_hours)
+        self._schedule_compact(self.config.compact_at)
+        
         # 保持运行
         while self.running:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
+            self._wakeup.clear()
+            self.apply_pending_config()
+            self.scheduler.run_pending()
+            self._wakeup.wait(self.poll_seconds)
     
-    def stop(self):
-        """停止服务"""
+    def stop(self, timeout: float = 300):
+        """停止服务，等待进行中的爬取任务完成后刷新输出队列"""
         logger.info("服务停止信号收到")
         self.running = False
+        self._wakeup.set()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        deadline = time.time() + timeout
+        if not self._job_lock.acquire(timeout=timeout):
+            logger.warning("等待爬取任务超时，未完成的数据可能丢失")
+        else:
+            self._job_lock.release()
+        links_done = self.wait_for_links(max(0.0, deadline - time.time()))
+        if not links_done:
+            logger.warning("等待跳转链接解析超时，本轮数据未提交")
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            # 压缩的写入均为临时文件 + 重命名，超时退出不会损坏归档
+            logger.info("等待压缩任务完成...")
+            self._compact_thread.join(max(0.0, deadline - time.time()))
+        self.pipeline.close(max(0.0, deadline - time.time()))
+        self.feed.close()
+        if links_done:
+            self.link_resolver.close()
+        for dispatcher in self.webhooks:
+            dispatcher.stop()
+        if self.feed_server:
+            self.feed_server.stop()
 
 
 def run_as_service():
@@ -105,8 +335,10 @@ def run_as_service():
         
         def __init__(self, args):
             win32serviceutil.ServiceFramework.__init__(self, args)
+            config_path = find_config()
+            setup_logging(load_config(config_path).resolve_log_dir())
             self.stop_event = win32event.CreateEvent(None, 0, 0, None)
-            self.service = TopHubService()
+            self.service = TopHubService(config_path=config_path)
             
         def SvcStop(self):
             self.ReportServiceStatus(win32service.SERVICE_STOP_PENDING)
@@ -120,8 +352,8 @@ def run_as_service():
                 (self._svc_name_, '')
             )
             try:
-                # 每2小时执行一次
-                self.service.run_scheduler(interval_hours=2)
+                # 按配置的 SCHEDULE_INTERVAL 执行(默认每2小时)
+                self.service.run_scheduler()
             except Exception as e:
                 servicemanager.LogErrorMsg(str(e))
                 
@@ -141,27 +373,33 @@ def run_interactive():
     
     choice = input("请选择 (1-4): ").strip()
     
-    service = TopHubService()
+    service = TopHubService(config_path=find_config())
     
-    if choice == "1":
-        service.run_once()
-    elif choice == "2":
-        print("按 Ctrl+C 停止服务")
-        try:
-            service.run_scheduler(interval_hours=1)
-        except KeyboardInterrupt:
-            print("\n服务已停止")
-    elif choice == "3":
-        print("按 Ctrl+C 停止服务")
-        try:
-            service.run_scheduler(interval_hours=2)
-        except KeyboardInterrupt:
-            print("\n服务已停止")
-    elif choice == "4":
-        sys.exit(0)
+    try:
+        if choice == "1":
+            service.run_once()
+        elif choice == "2":
+            print("按 Ctrl+C 停止服务")
+            try:
+                service.run_scheduler(interval_hours=1)
+            except KeyboardInterrupt:
+                print("\n服务已停止")
+        elif choice == "3":
+            print("按 Ctrl+C 停止服务")
+            try:
+                service.run_scheduler(interval_hours=2)
+            except KeyboardInterrupt:
+                print("\n服务已停止")
+        elif choice == "4":
+            sys.exit(0)
+    finally:
+        # 刷新输出队列，确保已爬取的数据落盘
+        service.stop()
 
 
 if __name__ == "__main__":
+    setup_logging(load_config(find_config()).resolve_log_dir())
+    
     # 检查是否以服务方式运行
     if len(sys.argv) > 1 and sys.argv[1] in ['install', 'remove', 'start', 'stop', 'restart']:
         try:
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+今日热榜 HTTP 传输层 - Transport
+
+为 TopHubScraper 提供可替换的 HTTP 客户端:
+- RequestsTransport: requests 会话 (默认)，显式连接池
+- HttpxTransport:    httpx 客户端，支持 HTTP/2 多路复用
+
+Accept-Encoding 只声明客户端实际能解码的编码 (gzip/deflate 总是支持，
+br/zstd 取决于是否安装 brotli/zstandard)，并统计每次请求的
+压缩前后字节数。本模块导入时不加载任何第三方库。
+"""
+
+import logging
+import importlib.util
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _has_module(name: str) -> bool:
+    """检查模块是否已安装(不导入)"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class TransportError(Exception):
+    """请求失败"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TransportTimeout(TransportError):
+    """请求超时"""
+
+
+class TransportProxyError(TransportError):
+    """代理错误"""
+
+
+@dataclass
+class TransportResponse:
+    """传输层响应"""
+    url: str
+    status_code: int
+    text: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    http_version: str = "HTTP/1.1"
+    content_encoding: str = "identity"
+    wire_bytes: int = 0         # 网络传输字节数(压缩后)
+    body_bytes: int = 0         # 解码后字节数
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise TransportError(f"HTTP {self.status_code}: {self.url}", self.status_code)
+
+
+class Transport:
+    """传输层基类"""
+
+    name = "base"
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None):
+        self.headers: Dict[str, str] = dict(headers or {})
+        self.stats = {"requests": 0, "wire_bytes": 0, "body_bytes": 0}
+
+    def supported_encodings(self) -> List[str]:
+        return ["gzip", "deflate"]
+
+    def get(
+        self,
+        url: str,
+        proxies: Optional[Dict[str, str]] = None,
+        timeout: float = 30
+    ) -> TransportResponse:
+        raise NotImplementedError
+
+    def _record(self, response: TransportResponse):
+        self.stats["requests"] += 1
+        self.stats["wire_bytes"] += response.wire_bytes
+        self.stats["body_bytes"] += response.body_bytes
+        ratio = response.body_bytes / response.wire_bytes if response.wire_bytes else 0
+        logger.info(
+            f"{response.http_version} {response.status_code} {response.content_encoding}: "
+            f"传输 {response.wire_bytes} 字节，解码后 {response.body_bytes} 字节 (x{ratio:.1f})"
+        )
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """requests 会话传输，连接在分类、节点页和多轮爬取间复用"""
+
+    name = "requests"
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        pool_connections: int = 4,      # 缓存的主机连接池数量
+        pool_maxsize: int = 8           # 每个主机的最大连接数
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        super().__init__(headers)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+        self.session.headers["Accept-Encoding"] = ", ".join(self.supported_encodings())
+        # 会话请求头即传输层请求头，修改后对后续请求生效
+        self.headers = self.session.headers
+
+    def supported_encodings(self) -> List[str]:
+        # urllib3 根据已安装的解码库生成该列表，与实际解码能力一致
+        from urllib3.util.request import ACCEPT_ENCODING
+        return [e.strip() for e in ACCEPT_ENCODING.split(",") if e.strip()]
+
+    def get(self, url, proxies=None, timeout=30) -> TransportResponse:
+        import requests
+
+        try:
+            response = self.session.get(
+                url, proxies=proxies, timeout=timeout, allow_redirects=True, stream=True
+            )
+            content = response.content
+        except requests.exceptions.ProxyError as e:
+            raise TransportProxyError(str(e)) from e
+        except requests.exceptions.Timeout as e:
+            raise TransportTimeout(str(e)) from e
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+
+        result = TransportResponse(
+            url=response.url,
+            status_code=response.status_code,
+            text=response.text,
+            headers=dict(response.headers),
+            http_version="HTTP/1.1",
+            content_encoding=response.headers.get("Content-Encoding", "identity"),
+            # raw.tell() 为从网络读取的字节数(解码前)
+            wire_bytes=response.raw.tell() or len(content),
+            body_bytes=len(content)
+        )
+        self._record(result)
+        return result
+
+    def close(self):
+        self.session.close()
+
+
+class HttpxTransport(Transport):
+    """httpx 客户端传输，安装 h2 时启用 HTTP/2，同一连接上多路复用请求"""
+
+    name = "httpx"
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        http2: bool = True,
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 60.0
+    ):
+        import httpx
+
+        super().__init__(headers)
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("未安装 h2，HTTP/2 不可用，回退到 HTTP/1.1 (pip install httpx[http2])")
+                http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.headers["Accept-Encoding"] = ", ".join(self.supported_encodings())
+        # httpx 的代理在客户端级别设置，每个代理一个客户端(各自持有连接池)
+        self._clients: Dict[Optional[str], "httpx.Client"] = {}
+
+    def supported_encodings(self) -> List[str]:
+        # httpx 在安装 brotli/brotlicffi 时解码 br，安装 zstandard 时解码 zstd
+        encodings = super().supported_encodings()
+        if _has_module("brotli") or _has_module("brotlicffi"):
+            encodings.append("br")
+        if _has_module("zstandard"):
+            encodings.append("zstd")
+        return encodings
+
+    def _client(self, proxy: Optional[str]):
+        import httpx
+
+        client = self._clients.get(proxy)
+        if client is None:
+            kwargs = {"http2": self.http2, "limits": self.limits, "follow_redirects": True}
+            if proxy:
+                kwargs["proxy"] = proxy
+            client = httpx.Client(**kwargs)
+            self._clients[proxy] = client
+        return client
+
+    def get(self, url, proxies=None, timeout=30) -> TransportResponse:
+        import httpx
+
+        proxy = (proxies or {}).get("https") or (proxies or {}).get("http")
+        try:
+            response = self._client(proxy).get(url, headers=dict(self.headers), timeout=timeout)
+            content = response.content
+        except httpx.ProxyError as e:
+            raise TransportProxyError(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise TransportTimeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+        result = TransportResponse(
+            url=str(response.url),
+            status_code=response.status_code,
+            text=response.text,
+            headers=dict(response.headers),
+            http_version=response.http_version,
+            content_encoding=response.headers.get("Content-Encoding", "identity"),
+            wire_bytes=response.num_bytes_downloaded,
+            body_bytes=len(content)
+        )
+        self._record(result)
+        return result
+
+    def close(self):
+        for client in self._clients.values():
+            client.close()
+        self._clients.clear()
+
+
+TRANSPORTS = {
+    "requests": RequestsTransport,
+    "httpx": HttpxTransport,
+}
+
+
+def create_transport(name: str = "requests", **kwargs) -> Transport:
+    """
+    按名称创建传输层
+
+    Args:
+        name: requests / httpx / auto (已安装 httpx 时使用 httpx，否则 requests)
+    """
+    if name == "auto":
+        try:
+            import httpx  # noqa: F401
+            name = "httpx"
+        except ImportError:
+            name = "requests"
+    if name not in TRANSPORTS:
+        raise ValueError(f"不支持的传输层: {name}，可选 {list(TRANSPORTS)} 或 auto")
+    return TRANSPORTS[name](**kwargs)
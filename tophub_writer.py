@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+今日热榜输出管道 - Output Pipeline
+
+爬取结果进入有界队列，由后台写入线程池并行扇出到各输出端
+(JSON、CSV、NDJSON、SQLite)，调度线程不再被磁盘 I/O 阻塞。
+
+特性:
+- 原子写入（临时文件 + fsync + 重命名）
+- 批量合并 fsync（同一批次内每个目录只同步一次）
+- 失败输出端指数退避重试，最终失败写入死信目录
+- 关闭时刷新队列，保证已提交的数据落盘
+"""
+
+import os
+import csv
+import json
+import time
+import queue
+import random
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+CSV_HEADER = ['平台', '排名', '标题', '链接', '热度', '时间戳']
+
+
+@dataclass
+class Snapshot:
+    """一次爬取结果"""
+    items: List                 # HotItem 列表
+    timestamp: str              # 文件名时间戳 (YYYYmmdd_HHMMSS)
+    submitted: float = field(default_factory=time.time)
+
+
+class FsyncBatch:
+    """合并一个批次内的 fsync：文件在提交时统一同步，每个目录只同步一次"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._files: Set[str] = set()
+        self._dirs: Set[str] = set()
+
+    def sync_file(self, f):
+        """原子替换前必须同步的文件"""
+        f.flush()
+        if self.enabled:
+            os.fsync(f.fileno())
+
+    def defer_file(self, path: str):
+        """追加写入的文件，延迟到批次提交时同步"""
+        with self._lock:
+            self._files.add(os.path.abspath(path))
+
+    def defer_dir(self, path: str):
+        with self._lock:
+            self._dirs.add(os.path.abspath(path))
+
+    def commit(self):
+        if not self.enabled:
+            return
+        for path in self._files:
+            with open(path, 'ab') as f:
+                os.fsync(f.fileno())
+        # Windows 不支持对目录 fsync
+        if os.name != 'nt':
+            for path in self._dirs:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        self._files.clear()
+        self._dirs.clear()
+
+
+def atomic_write(
+    filepath: str,
+    write: Callable,
+    batch: FsyncBatch,
+    newline: Optional[str] = None,
+    encoding: str = 'utf-8'
+):
+    """写入临时文件并同步后重命名，读者永远看不到写了一半的文件"""
+    Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{filepath}.tmp"
+    try:
+        with open(tmp_path, 'w', newline=newline, encoding=encoding) as f:
+            write(f)
+            batch.sync_file(f)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    batch.defer_dir(os.path.dirname(filepath) or '.')
+
+
+class Sink:
+    """输出端基类"""
+
+    name = "sink"
+
+    def write(self, snapshot: Snapshot, batch: FsyncBatch):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonSink(Sink):
+    """每次快照一个 JSON 文件 (与 save_to_json 格式一致)"""
+
+    name = "json"
+
+    def __init__(self, output_dir: str, prefix: str = "tophub"):
+        self.output_dir = output_dir
+        self.prefix = prefix
+
+    def write(self, snapshot: Snapshot, batch: FsyncBatch):
+        filepath = os.path.join(self.output_dir, f"{self.prefix}_{snapshot.timestamp}.json")
+        data = [item.to_dict() for item in snapshot.items]
+        atomic_write(filepath, lambda f: json.dump(data, f, ensure_ascii=False, indent=2), batch)
+        logger.info(f"数据已保存到: {filepath}")
+
+
+class CsvSink(Sink):
+    """每次快照一个 CSV 文件 (与 save_to_csv 格式一致)"""
+
+    name = "csv"
+
+    def __init__(self, output_dir: str, prefix: str = "tophub"):
+        self.output_dir = output_dir
+        self.prefix = prefix
+
+    def write(self, snapshot: Snapshot, batch: FsyncBatch):
+        filepath = os.path.join(self.output_dir, f"{self.prefix}_{snapshot.timestamp}.csv")
+
+        def _write(f):
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            for item in snapshot.items:
+                writer.writerow([
+                    item.platform,
+                    item.ranking,
+                    item.title,
+                    item.url,
+                    item.heat,
+                    item.timestamp
+                ])
+
+        atomic_write(filepath, _write, batch, newline='', encoding='utf-8-sig')
+        logger.info(f"数据已保存到: {filepath}")
+
+
+class NdjsonSink(Sink):
+    """
+    按天追加的 NDJSON 流文件，一行一条
+
+    追加失败时截断回写入前的位置，重试不会留下半行或重复记录。
+    """
+
+    name = "ndjson"
+
+    def __init__(self, output_dir: str, prefix: str = "tophub_stream"):
+        self.output_dir = output_dir
+        self.prefix = prefix
+
+    def write(self, snapshot: Snapshot, batch: FsyncBatch):
+        day = snapshot.timestamp.split('_')[0]
+        filepath = os.path.join(self.output_dir, f"{self.prefix}_{day}.ndjson")
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+        # 整个快照一次写入，减少并发读者看到半行的概率
+        data = "".join(
+            json.dumps(item.to_dict(), ensure_ascii=False) + "\n" for item in snapshot.items
+        ).encode('utf-8')
+        with open(filepath, 'ab') as f:
+            offset = self._repair_tail(f)
+            try:
+                f.write(data)
+                f.flush()
+            except BaseException:
+                # 磁盘满、网络盘断开等导致部分写入，回退到写入前的位置
+                f.truncate(offset)
+                raise
+        batch.defer_file(filepath)
+        logger.info(f"数据已追加到: {filepath}")
+
+    @staticmethod
+    def _repair_tail(f) -> int:
+        """
+        返回追加位置；上次写入失败且未能截断时，先丢弃末尾不完整的行
+
+        打开方式为 'ab' 时写入总在文件末尾，截断后的末尾即为写入位置。
+        """
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return 0
+        with open(f.name, 'rb') as reader:
+            reader.seek(end - 1)
+            if reader.read(1) == b"\n":
+                return end
+            # 向前查找最后一个完整行
+            pos = end
+            while pos > 0:
+                step = min(65536, pos)
+                reader.seek(pos - step)
+                chunk = reader.read(step)
+                idx = chunk.rfind(b"\n")
+                if idx >= 0:
+                    pos = pos - step + idx + 1
+                    break
+                pos -= step
+        logger.warning(f"丢弃上次写入失败残留的不完整行: {f.name} ({end - pos} 字节)")
+        f.truncate(pos)
+        return pos
+
+
+class SqliteSink(Sink):
+    """SQLite 数据库输出端，每个快照一个事务"""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS hot_items (
+                snapshot TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                ranking INTEGER,
+                title TEXT NOT NULL,
+                url TEXT,
+                heat TEXT,
+                timestamp TEXT
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_hot_items_snapshot ON hot_items(snapshot)"
+        )
+        self.conn.commit()
+
+    def write(self, snapshot: Snapshot, batch: FsyncBatch):
+        rows = [
+            (snapshot.timestamp, item.platform, item.ranking, item.title, item.url,
+             None if item.heat is None else str(item.heat), item.timestamp)
+            for item in snapshot.items
+        ]
+        with self._lock, self.conn:
+            # 重试时先删除本快照已写入的行，保证幂等
+            self.conn.execute("DELETE FROM hot_items WHERE snapshot = ?", (snapshot.timestamp,))
+            self.conn.executemany("INSERT INTO hot_items VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        logger.info(f"数据已写入数据库: {self.db_path}")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class OutputPipeline:
+    """有界队列 + 后台写入线程池"""
+
+    def __init__(
+        self,
+        sinks: List[Sink],
+        queue_size: int = 100,                  # 队列长度，满时提交方阻塞
+        max_workers: int = 4,                   # 并行写入线程数
+        max_retries: int = 3,                   # 单个输出端最大重试次数
+        batch_size: int = 16,                   # 单批最多合并的快照数
+        fsync: bool = True,                     # 是否 fsync
+        dead_letter_dir: Optional[str] = None   # 最终失败的快照保存目录
+    ):
+        self.sinks = sinks
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.dead_letter_dir = dead_letter_dir
+
+        self.queue: "queue.Queue[Snapshot]" = queue.Queue(maxsize=queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tophub-writer")
+        self.stats: Dict[str, float] = {
+            "submitted": 0, "written": 0, "failed": 0, "last_lag": 0.0, "max_lag": 0.0
+        }
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="tophub-writer-dispatch", daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List, timestamp: Optional[str] = None, timeout: Optional[float] = None):
+        """提交一次爬取结果，队列满时阻塞等待(背压)"""
+        snapshot = Snapshot(items=list(items), timestamp=timestamp or datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.stats["submitted"] += 1
+        if self._closed:
+            # 管道已关闭（例如停止过程中仍有任务完成），直接同步写入，避免丢数据
+            logger.warning("输出管道已关闭，同步写入本批数据")
+            self._write_batch([snapshot])
+            return
+        if self.queue.full():
+            logger.warning(f"输出队列已满 ({self.queue.maxsize})，等待写入线程...")
+        self.queue.put(snapshot, timeout=timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中的数据全部写入"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.time() > deadline:
+                logger.warning(f"刷新超时，仍有 {self.queue.unfinished_tasks} 个快照未写入")
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self, timeout: Optional[float] = 60):
+        """刷新并关闭管道，总耗时不超过 timeout；输出端卡住时放弃等待，不关闭输出端"""
+        if self._closed:
+            return
+        deadline = None if timeout is None else time.time() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.time())
+
+        logger.info("正在刷新输出队列...")
+        self.flush(timeout)
+        self._closed = True
+        try:
+            self.queue.put(None, timeout=remaining())
+        except queue.Full:
+            logger.error(f"输出队列已满且写入线程无响应，{self.queue.qsize()} 个快照未写入，放弃等待")
+            return
+        self._thread.join(remaining())
+        if self._thread.is_alive():
+            logger.error("等待写入线程超时，放弃等待，未完成的快照可能丢失")
+            self.executor.shutdown(wait=False)
+            return
+        self.executor.shutdown(wait=True)
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logger.warning(f"关闭输出端 {sink.name} 时出错: {e}")
+        logger.info(f"输出管道已关闭: {self.stats}")
+
+    def _run(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                self.queue.task_done()
+                return
+            # 合并积压的快照，一个批次只做一次目录 fsync
+            batch = [snapshot]
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self.queue.put(None)
+                    self.queue.task_done()
+                    break
+                batch.append(nxt)
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.error(f"写入批次时出错: {e}", exc_info=True)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write_batch(self, batch: List[Snapshot]):
+        fsync_batch = FsyncBatch(enabled=self.fsync)
+        # 输出端之间并行，同一输出端内按快照顺序写入
+        if self._closed:
+            results = [(sink, self._write_sink(sink, batch, fsync_batch)) for sink in self.sinks]
+        else:
+            futures = [
+                (sink, self.executor.submit(self._write_sink, sink, batch, fsync_batch))
+                for sink in self.sinks
+            ]
+            results = [(sink, future.result()) for sink, future in futures]
+        failed = {sink.name: snapshots for sink, snapshots in results if snapshots}
+
+        try:
+            fsync_batch.commit()
+        except OSError as e:
+            logger.warning(f"fsync 失败: {e}")
+
+        for sink_name, snapshots in failed.items():
+            for snapshot in snapshots:
+                self._dead_letter(sink_name, snapshot)
+
+        # 只统计所有输出端都写入成功的快照，失败的快照不计入吞吐和延迟
+        failed_ids = {id(s) for snapshots in failed.values() for s in snapshots}
+        written = [s for s in batch if id(s) not in failed_ids]
+        now = time.time()
+        for snapshot in written:
+            lag = now - snapshot.submitted
+            self.stats["last_lag"] = lag
+            self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+        self.stats["written"] += len(written)
+        self.stats["failed"] += len(failed_ids)
+
+    def _write_sink(self, sink: Sink, batch: List[Snapshot], fsync_batch: FsyncBatch) -> List[Snapshot]:
+        """写入单个输出端，返回最终失败的快照"""
+        failed = []
+        for snapshot in batch:
+            for attempt in range(self.max_retries):
+                try:
+                    sink.write(snapshot, fsync_batch)
+                    break
+                except Exception as e:
+                    if attempt < self.max_retries - 1:
+                        backoff_time = 2 ** attempt + random.uniform(0, 1)
+                        logger.warning(
+                            f"输出端 {sink.name} 写入失败: {e}，退避 {backoff_time:.2f} 秒后重试..."
+                        )
+                        time.sleep(backoff_time)
+                    else:
+                        logger.error(f"输出端 {sink.name} 达到最大重试次数: {e}")
+                        failed.append(snapshot)
+        return failed
+
+    def _dead_letter(self, sink_name: str, snapshot: Snapshot):
+        """保存最终失败的快照，便于事后补写"""
+        if not self.dead_letter_dir:
+            logger.error(f"输出端 {sink_name} 丢失快照 {snapshot.timestamp}")
+            return
+        filepath = os.path.join(
+            self.dead_letter_dir, f"{sink_name}_{snapshot.timestamp}.json"
+        )
+        try:
+            data = [item.to_dict() for item in snapshot.items]
+            atomic_write(
+                filepath,
+                lambda f: json.dump(data, f, ensure_ascii=False, indent=2),
+                FsyncBatch(enabled=self.fsync)
+            )
+            logger.error(f"输出端 {sink_name} 写入失败，快照已保存到: {filepath}")
+        except OSError as e:
+            logger.error(f"保存死信快照失败: {e}")